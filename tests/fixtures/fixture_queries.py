@@ -0,0 +1,146 @@
+"""Бюджеты запросов к базе и времени ответа для представлений.
+
+Фикстура budget_client — обычный тестовый клиент, который записывает
+каждый SQL-запрос запроса к сайту и сверяет их число и время ответа
+с бюджетом представления из VIEW_BUDGETS. Бюджет можно переопределить
+маркером ``@pytest.mark.budget(queries=..., ms=...)``. Время ответа
+проверяется, только если ms задан явно: на общей машине оно
+слишком неустойчиво для бюджета по умолчанию. При превышении тест
+падает с отчётом: все запросы и повторяющиеся с точностью до
+параметров (признак N+1).
+"""
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+import pytest
+from django.core.cache import cache
+
+from core import db
+
+
+@dataclass
+class Budget:
+    queries: int
+    ms: float = None
+
+
+# Холодный кэш, авторизованный пользователь: сессия и пользователь
+# входят в бюджет.
+VIEW_BUDGETS = {
+    'posts:index': Budget(5),
+    'posts:group_posts': Budget(5),
+    'posts:profile': Budget(6),
+    'posts:post_detail': Budget(4),
+    'posts:post_comments': Budget(2),
+    'posts:follow_index': Budget(5),
+    'posts:post_search': Budget(3),
+    'posts:post_create': Budget(3),
+    'posts:post_edit': Budget(5),
+}
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+IN_LISTS = re.compile(r'IN \((?:\?, )*\?\)')
+
+
+def normalize(sql):
+    """Текст запроса без параметров: одинаковые запросы совпадают."""
+    return IN_LISTS.sub('IN (...)', LITERALS.sub('?', sql))
+
+
+@dataclass
+class Recording:
+    view_name: str = None
+    ms: float = 0
+    queries: list = field(default_factory=list)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, params, (time.perf_counter() - started) * 1000)
+            )
+
+    def duplicates(self):
+        counts = Counter(normalize(sql) for sql, _, _ in self.queries)
+        return [(sql, count) for sql, count in counts.items() if count > 1]
+
+    def exceeds(self, budget):
+        return len(self.queries) > budget.queries or (
+            budget.ms is not None and self.ms > budget.ms
+        )
+
+    def report(self, budget):
+        header = (
+            f'{self.view_name}: {len(self.queries)} запросов '
+            f'(бюджет {budget.queries}), {self.ms:.1f} мс'
+        )
+        if budget.ms is not None:
+            header += f' (бюджет {budget.ms} мс)'
+        lines = [header]
+        for number, (sql, params, ms) in enumerate(self.queries, start=1):
+            lines.append(f'{number:>3}. [{ms:.2f} мс] {sql} {params}')
+        duplicates = self.duplicates()
+        if duplicates:
+            lines.append('Повторяющиеся запросы (возможен N+1):')
+            lines.extend(
+                f'  x{count}: {sql}' for sql, count in duplicates
+            )
+        return '\n'.join(lines)
+
+
+class BudgetClient:
+    """Обёртка над тестовым клиентом, проверяющая бюджеты."""
+
+    def __init__(self, client, override=None):
+        self.client = client
+        self.override = override
+        self.recordings = []
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def budget_for(self, view_name):
+        if self.override is not None:
+            return self.override
+        return VIEW_BUDGETS.get(view_name)
+
+    def _checked(self, method, path, *args, **kwargs):
+        recording = Recording()
+        with db.execute_wrapper(recording):
+            started = time.perf_counter()
+            response = method(path, *args, **kwargs)
+            recording.ms = (time.perf_counter() - started) * 1000
+        match = response.resolver_match
+        recording.view_name = match.view_name if match else path
+        self.recordings.append(recording)
+        budget = self.budget_for(recording.view_name)
+        if budget is not None and recording.exceeds(budget):
+            pytest.fail(recording.report(budget), pytrace=False)
+        return response
+
+    def get(self, path, *args, **kwargs):
+        return self._checked(self.client.get, path, *args, **kwargs)
+
+    def post(self, path, *args, **kwargs):
+        return self._checked(self.client.post, path, *args, **kwargs)
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'budget(queries, ms=None): бюджет запросов и, если задан, '
+        'времени для теста',
+    )
+
+
+@pytest.fixture
+def budget_client(request, client):
+    """Клиент, у которого каждый запрос укладывается в бюджет."""
+    cache.clear()
+    marker = request.node.get_closest_marker('budget')
+    override = Budget(*marker.args, **marker.kwargs) if marker else None
+    return BudgetClient(client, override)
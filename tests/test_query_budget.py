@@ -0,0 +1,76 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+from posts.models import Comment, Group, Post
+
+from tests.fixtures.fixture_queries import Recording
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def crowded_feed(mixer, user, another_user, group):
+    """Посты разных авторов и групп: N+1 по ним был бы заметен."""
+    mixer.blend('posts.Follow', user=user, author=another_user)
+    posts = []
+    for i in range(10):
+        author = another_user if i % 2 else mixer.blend('auth.User')
+        own_group = mixer.blend(Group, slug=f'group-{i}')
+        posts.append(Post.objects.create(
+            text=f'Пост {i}', author=author, group=own_group
+        ))
+        Post.objects.create(text=f'Пост группы {i}', author=user, group=group)
+    for post in posts:
+        Comment.objects.create(
+            post=posts[0], author=post.author, text='Комментарий'
+        )
+    return posts[0]
+
+
+class TestQueryBudget:
+
+    def test_views_within_budget(self, budget_client, user, crowded_feed):
+        budget_client.force_login(user)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=(crowded_feed.group.slug,)),
+            reverse('posts:profile', args=(user.username,)),
+            reverse('posts:post_detail', args=(crowded_feed.pk,)),
+            reverse('posts:post_comments', args=(crowded_feed.pk,)),
+            reverse('posts:follow_index'),
+            reverse('posts:post_search') + '?q=пост',
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=(user.posts.first().pk,)),
+        ]
+        for url in urls:
+            response = budget_client.get(url)
+            assert response.status_code == 200, (
+                f'Страница `{url}` должна открываться'
+            )
+
+    @pytest.mark.budget(5)
+    def test_budget_reports_repeated_queries(self, budget_client, user,
+                                             crowded_feed, monkeypatch):
+        # Лента без select_related: автор каждой карточки — свой запрос.
+        monkeypatch.setattr(Post.objects, 'for_feed', Post.objects.all)
+        budget_client.force_login(user)
+        with pytest.raises(pytest.fail.Exception) as failure:
+            budget_client.get(reverse('posts:index'))
+        report = str(failure.value)
+        assert 'бюджет 5' in report
+        assert 'Повторяющиеся запросы (возможен N+1):' in report
+        assert 'x10: SELECT' in report
+        assert budget_client.recordings[-1].view_name == 'posts:index'
+
+    def test_repeated_queries_are_grouped(self, crowded_feed):
+        recording = Recording()
+        with connection.execute_wrapper(recording):
+            posts = list(Post.objects.all())
+            for post in posts:
+                post.author.username
+        duplicates = dict(recording.duplicates())
+        assert list(duplicates.values()) == [len(posts)], (
+            'Одинаковые с точностью до параметров запросы должны '
+            'попадать в отчёт о N+1'
+        )
+        assert 'auth_user' in next(iter(duplicates))
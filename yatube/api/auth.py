@@ -0,0 +1,53 @@
+"""Аутентификация API: сессия сайта или подписанный токен.
+
+Токен выдаёт POST /api/v1/auth/token/ по логину и паролю. Он не
+хранится в базе: это подписанные id пользователя и хэш его пароля,
+поэтому проверка стоит одного запроса за пользователем, а смена пароля
+отзывает все токены. Сессионные запросы на запись проверяют CSRF, как
+и формы сайта.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.middleware.csrf import CsrfViewMiddleware
+
+from .errors import ApiError
+
+User = get_user_model()
+
+SALT = 'api.token'
+SCHEME = 'token'
+
+
+def make_token(user):
+    return signing.dumps(
+        {'id': user.pk, 'hash': user.get_session_auth_hash()}, salt=SALT
+    )
+
+
+def _token_user(token):
+    try:
+        payload = signing.loads(
+            token, salt=SALT, max_age=settings.API_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        raise ApiError(401, 'Токен недействителен или устарел')
+    user = User.objects.filter(pk=payload['id'], is_active=True).first()
+    if user is None or user.get_session_auth_hash() != payload['hash']:
+        raise ApiError(401, 'Токен недействителен или устарел')
+    return user
+
+
+def authenticate(request, safe):
+    """Определяет request.user по токену или сессии."""
+    scheme, _, token = request.META.get('HTTP_AUTHORIZATION', '').partition(
+        ' '
+    )
+    if scheme.lower() == SCHEME:
+        request.user = _token_user(token.strip())
+        return
+    if safe or not request.user.is_authenticated:
+        return
+    reason = CsrfViewMiddleware().process_view(request, None, (), {})
+    if reason is not None:
+        raise ApiError(403, 'Не пройдена проверка CSRF')
@@ -0,0 +1,208 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from api.views import PAGE_SIZE
+from posts.models import Comment, Follow, Group, Post, User
+
+COUNT_OF_POSTS = PAGE_SIZE + 5
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', password='secret-password'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        for i in range(COUNT_OF_POSTS):
+            Post.objects.create(
+                text=f'Пост {i}',
+                author=cls.author,
+                group=None if i % 2 else cls.group,
+            )
+        cls.post = Post.objects.latest('pk')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def send(self, client, method, url, data=None, **extra):
+        return getattr(client, method)(
+            url, json.dumps(data or {}), content_type='application/json',
+            **extra
+        )
+
+    def test_feed_pages_with_cursor(self):
+        """Лента листается курсором без N+1"""
+        with self.assertNumQueries(1):
+            data = self.client.get(reverse('api:posts')).json()
+        self.assertEqual(len(data['results']), PAGE_SIZE)
+        self.assertEqual(data['results'][0]['text'], self.post.text)
+        self.assertEqual(data['results'][0]['author'], 'author')
+        self.assertIsNone(data['previous'])
+        data = self.client.get(data['next']).json()
+        self.assertEqual(len(data['results']), COUNT_OF_POSTS - PAGE_SIZE)
+        self.assertIsNone(data['next'])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет в ответе и в запросе только нужное"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('api:posts'), {'fields': 'id,text'}
+            )
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'text'})
+        sql, = [query['sql'] for query in queries]
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"image"', sql)
+        response = self.client.get(reverse('api:posts'), {'fields': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_group_and_profile_feeds(self):
+        """Ленты группы и автора"""
+        data = self.client.get(
+            reverse('api:group_posts', args=(self.group.slug,)),
+            {'fields': 'group'}
+        ).json()
+        self.assertEqual(
+            {post['group'] for post in data['results']}, {self.group.slug}
+        )
+        data = self.client.get(
+            reverse('api:profile_posts', args=(self.reader.username,))
+        ).json()
+        self.assertEqual(data['results'], [])
+        response = self.client.get(
+            reverse('api:group_posts', args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('detail', response.json())
+
+    def test_create_requires_user(self):
+        """Гость не может писать, пользователь — может"""
+        response = self.send(
+            self.client, 'post', reverse('api:posts'), {'text': 'Новый'}
+        )
+        self.assertEqual(response.status_code, 401)
+        response = self.send(
+            self.reader_client, 'post', reverse('api:posts'),
+            {'text': 'Новый', 'group': self.group.slug}
+        )
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(pk=response.json()['id'])
+        self.assertEqual(post.author, self.reader)
+        self.assertEqual(post.group, self.group)
+
+    def test_token_auth(self):
+        """Токен из /auth/token/ заменяет сессию"""
+        response = self.send(
+            self.client, 'post', reverse('api:token'),
+            {'username': 'author', 'password': 'secret-password'}
+        )
+        token = response.json()['token']
+        response = self.send(
+            Client(enforce_csrf_checks=True), 'post', reverse('api:posts'),
+            {'text': 'По токену'}, HTTP_AUTHORIZATION=f'Token {token}'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'author')
+        response = self.send(
+            self.client, 'post', reverse('api:posts'),
+            {'text': 'По токену'}, HTTP_AUTHORIZATION='Token broken'
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_session_writes_check_csrf(self):
+        """Запись по сессии без CSRF-токена отклоняется"""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.reader)
+        response = self.send(
+            client, 'post', reverse('api:posts'), {'text': 'Без CSRF'}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_only_author_edits(self):
+        """Менять и удалять пост может только автор"""
+        url = reverse('api:post_detail', args=(self.post.pk,))
+        response = self.send(
+            self.reader_client, 'patch', url, {'text': 'Чужая правка'}
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.send(
+            self.author_client, 'patch', url, {'text': 'Правка'}
+        )
+        self.assertEqual(response.json()['text'], 'Правка')
+        self.assertEqual(response.json()['group'], self.post.group.slug)
+        response = self.author_client.delete(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_comments(self):
+        """Комментарии читаются от старых и добавляются"""
+        url = reverse('api:comments', args=(self.post.pk,))
+        for text in ('Первый', 'Второй'):
+            response = self.send(
+                self.reader_client, 'post', url, {'text': text}
+            )
+            self.assertEqual(response.status_code, 201)
+        with self.assertNumQueries(2):
+            data = self.client.get(url).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Первый', 'Второй']
+        )
+        self.assertEqual(data['results'][0]['author'], 'reader')
+        self.assertEqual(
+            Comment.objects.filter(post=self.post).count(), 2
+        )
+
+    def test_follow(self):
+        """Подписка, лента подписок и отписка"""
+        url = reverse('api:follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'author'}
+        )
+        self.assertEqual(response.status_code, 201)
+        with mock.patch('posts.timeline.hybrid_posts') as hybrid_posts:
+            data = self.reader_client.get(url).json()
+        hybrid_posts.assert_not_called()
+        self.assertEqual(len(data['results']), PAGE_SIZE)
+        self.assertEqual(data['results'][0]['author'], 'author')
+        self.assertEqual(
+            data['results'][0]['text'], f'Пост {COUNT_OF_POSTS - 1}'
+        )
+        data = self.reader_client.get(data['next']).json()
+        self.assertEqual(len(data['results']), COUNT_OF_POSTS - PAGE_SIZE)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.reader_client.get(url, {'fields': 'id'}).json()
+        self.assertEqual(list(data['results'][0]), ['id'])
+        self.assertEqual(
+            len([q for q in queries if 'posts_post' in q['sql']]), 1
+        )
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'reader'}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.reader_client.delete(
+            reverse('api:unfollow', args=('author',))
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Follow.objects.filter(user=self.reader).exists())
+
+    def test_method_not_allowed(self):
+        """Неподдерживаемый метод — 405 с заголовком Allow"""
+        response = self.client.put(reverse('api:posts'))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(response['Allow'], 'GET, POST')
@@ -0,0 +1,24 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('auth/token/', views.token, name='token'),
+    path('posts/', views.posts, name='posts'),
+    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/', views.comments, name='comments'
+    ),
+    path(
+        'groups/<slug:slug>/posts/', views.group_posts, name='group_posts'
+    ),
+    path(
+        'profile/<str:username>/posts/',
+        views.profile_posts,
+        name='profile_posts'
+    ),
+    path('follow/', views.follow, name='follow'),
+    path('follow/<str:username>/', views.unfollow, name='unfollow'),
+]
@@ -0,0 +1,244 @@
+import json
+from functools import wraps
+
+from django.contrib.auth import authenticate as check_password
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+
+from posts import timeline
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import CursorPaginator
+from posts.views import COMMENTS_ORDERING
+
+from . import auth
+from .errors import ApiError
+from .serializers import CommentSerializer, PostSerializer
+
+PAGE_SIZE = 20
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def api_view(*methods, anonymous=False):
+    """Представление API: методы, аутентификация и ошибки в JSON.
+
+    Изменять данные может только вошедший пользователь, если
+    представление не отмечено anonymous.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise ApiError(405, 'Метод не поддерживается')
+                safe = request.method in SAFE_METHODS
+                auth.authenticate(request, safe)
+                if not (safe or anonymous):
+                    login_required(request)
+                return view(request, *args, **kwargs)
+            except Http404:
+                return error_response(ApiError(404, 'Не найдено'))
+            except ApiError as error:
+                response = error_response(error)
+                if error.status == 405:
+                    response['Allow'] = ', '.join(methods)
+                return response
+        return wrapper
+    return decorator
+
+
+def json_response(data, status=200):
+    # Кириллица без \uXXXX: вдвое меньше байт.
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def error_response(error):
+    data = {'detail': error.detail}
+    if error.errors:
+        data['errors'] = error.errors
+    return json_response(data, status=error.status)
+
+
+def login_required(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Нужна аутентификация')
+
+
+def request_data(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError(400, 'Тело запроса — не JSON')
+    if not isinstance(data, dict):
+        raise ApiError(400, 'Ожидался объект JSON')
+    return data
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def paginated(request, queryset, serializer, ordering=None, through=None):
+    """Страница записей курсором и ссылки на соседние страницы.
+
+    through — связь от строк queryset к записям (см. Serializer.prepare).
+    """
+    options = {'ordering': ordering} if ordering else {}
+    paginator = CursorPaginator(
+        serializer.prepare(queryset, through), PAGE_SIZE, **options
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    if through is not None:
+        page = [getattr(row, through) for row in page]
+    return json_response({
+        'results': [serializer.to_dict(obj) for obj in page],
+        'next': page_url(request, paginator.next_cursor),
+        'previous': page_url(request, paginator.previous_cursor),
+    })
+
+
+def post_list(request, queryset):
+    return paginated(request, queryset, PostSerializer(request))
+
+
+def post_response(request, post, status=200):
+    serializer = PostSerializer(request)
+    post = serializer.prepare(Post.objects.all()).get(pk=post.pk)
+    return json_response(serializer.to_dict(post), status=status)
+
+
+def save_post(request, post=None):
+    """Создаёт или меняет пост; группа передаётся слагом."""
+    data = request_data(request)
+    if post is not None:
+        data = {
+            'text': post.text,
+            'group': post.group.slug if post.group_id else None,
+            **data,
+        }
+    if data.get('group'):
+        group = Group.objects.filter(slug=data['group']).first()
+        if group is None:
+            raise ApiError(400, 'Нет такой группы', {'group': [data['group']]})
+        data['group'] = group.pk
+    form = PostForm(data, instance=post)
+    if not form.is_valid():
+        raise ApiError(400, 'Ошибка в данных', form.errors)
+    post = form.save(commit=False)
+    post.author = request.user
+    post.save()
+    return post
+
+
+@api_view('POST', anonymous=True)
+def token(request):
+    data = request_data(request)
+    user = check_password(
+        request, username=data.get('username'), password=data.get('password')
+    )
+    if user is None:
+        raise ApiError(400, 'Неверный логин или пароль')
+    return json_response({'token': auth.make_token(user)})
+
+
+@api_view('GET', 'POST')
+def posts(request):
+    if request.method == 'POST':
+        return post_response(request, save_post(request), status=201)
+    return post_list(request, Post.objects.all())
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+def post_detail(request, post_id):
+    if request.method == 'GET':
+        serializer = PostSerializer(request)
+        post = get_object_or_404(
+            serializer.prepare(Post.objects.all()), pk=post_id
+        )
+        return json_response(serializer.to_dict(post))
+    post = get_object_or_404(Post.objects.select_related('group'), pk=post_id)
+    if post.author_id != request.user.pk:
+        raise ApiError(403, 'Менять пост может только автор')
+    if request.method == 'DELETE':
+        post.delete()
+        return HttpResponse(status=204)
+    return post_response(request, save_post(request, post))
+
+
+@api_view('GET')
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return post_list(request, Post.objects.filter(group_id=group.pk))
+
+
+@api_view('GET')
+def profile_posts(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return post_list(request, Post.objects.filter(author_id=author.pk))
+
+
+@api_view('GET', 'POST')
+def comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    serializer = CommentSerializer(request)
+    if request.method == 'GET':
+        return paginated(
+            request,
+            Comment.objects.filter(post_id=post.pk).order_by(
+                *COMMENTS_ORDERING
+            ),
+            serializer,
+            ordering=COMMENTS_ORDERING,
+        )
+    form = CommentForm(request_data(request))
+    if not form.is_valid():
+        raise ApiError(400, 'Ошибка в данных', form.errors)
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post = post
+    comment.save()
+    comment = serializer.prepare(Comment.objects.all()).get(pk=comment.pk)
+    return json_response(serializer.to_dict(comment), status=201)
+
+
+@api_view('GET', 'POST')
+def follow(request):
+    """Лента подписок или новая подписка на автора."""
+    login_required(request)
+    if request.method == 'GET':
+        followed = timeline.followed_authors(request.user)
+        pulled = timeline.pulled_authors(followed)
+        if pulled:
+            return post_list(
+                request, timeline.hybrid_posts(request.user, pulled)
+            )
+        # Без авторов на лету лента читается готовой, как в follow_index
+        return paginated(
+            request, timeline.entries(request.user),
+            PostSerializer(request), through='post'
+        )
+    username = request_data(request).get('author')
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    if author.pk == request.user.pk:
+        raise ApiError(400, 'Нельзя подписаться на себя')
+    _, created = Follow.objects.get_or_create(
+        user=request.user, author=author
+    )
+    return json_response(
+        {'author': username}, status=201 if created else 200
+    )
+
+
+@api_view('DELETE')
+def unfollow(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    Follow.objects.filter(user=request.user, author=author).delete()
+    return HttpResponse(status=204)
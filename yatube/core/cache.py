@@ -0,0 +1,159 @@
+"""Двухуровневый кэш: память процесса поверх общего хранилища.
+
+Общее хранилище (файлы, memcached, redis — см. CACHES в настройках)
+видят все процессы, поэтому сброс ключа в одном воркере доходит до
+остальных. Перед ним стоит небольшой кэш в памяти процесса: он
+снимает сетевой запрос с горячих ключей, но держит значения не дольше
+LOCAL_TIMEOUT секунд, чтобы чужие изменения догоняли быстро. Ключи
+с префиксами из SHARED_ONLY (номера поколений, счётчики) читаются
+только из общего хранилища.
+
+get_or_set защищает от лавины промахов: значение считает один процесс,
+взявший блокировку в общем хранилище, остальные ждут готового.
+"""
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+LOCK_PREFIX = 'lock:'
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.shared_only = tuple(options.get('SHARED_ONLY', ()))
+        self.lock_timeout = options.get('LOCK_TIMEOUT', 10)
+        self.lock_poll = options.get('LOCK_POLL', 0.05)
+        self.local = LocMemCache(location or 'tiered', {
+            'TIMEOUT': self.local_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('LOCAL_MAX_ENTRIES', 1000)},
+        })
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _is_local(self, key):
+        return not key.startswith(self.shared_only)
+
+    def _local_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def _remember(self, key, value, timeout, version):
+        if self._is_local(key):
+            self.local.set(
+                key, value, self._local_timeout(timeout), version=version
+            )
+
+    def get(self, key, default=None, version=None):
+        if self._is_local(key):
+            value = self.local.get(key, self, version=version)
+            if value is not self:
+                return value
+        value = self.shared.get(key, self, version=version)
+        if value is self:
+            return default
+        self._remember(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.local.get_many(
+            [key for key in keys if self._is_local(key)], version=version
+        )
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            for key, value in shared.items():
+                self._remember(key, value, DEFAULT_TIMEOUT, version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in (failed or ()):
+                self._remember(key, value, timeout, version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(key, value, timeout, version)
+        else:
+            self.local.delete(key, version=version)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(key, version=version)
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self.local.delete(key, version=version)
+        return self.shared.decr(key, delta, version=version)
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version=version)
+        self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.local.delete_many(keys, version=version)
+        self.shared.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, self, version=version) is not self
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT,
+                   version=None):
+        """Значение ключа; при промахе его считает только один процесс."""
+        value = self.get(key, self, version=version)
+        if value is not self:
+            return value
+        if not callable(default):
+            self.add(key, default, timeout, version=version)
+            return self.get(key, default, version=version)
+        lock = LOCK_PREFIX + key
+        if self.shared.add(lock, 1, self.lock_timeout, version=version):
+            try:
+                value = default()
+                if value is not None:
+                    self.set(key, value, timeout, version=version)
+                return value
+            finally:
+                self.shared.delete(lock, version=version)
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.lock_poll)
+            value = self.shared.get(key, self, version=version)
+            if value is not self:
+                self._remember(key, value, timeout, version)
+                return value
+        # Держатель блокировки не справился: считаем сами.
+        value = default()
+        if value is not None:
+            self.add(key, value, timeout, version=version)
+        return value
@@ -0,0 +1,8 @@
+from django.conf import settings
+
+
+def fragment_timeout(request):
+    """Добавляет срок жизни фрагментов для тега cache."""
+    return {
+        'fragment_timeout': settings.FRAGMENT_CACHE_SECONDS
+    }
@@ -0,0 +1,37 @@
+"""Соединения с базой: настройка новых и обёртка запросов всех баз.
+
+SQLite по умолчанию пишет журнал отката и блокирует чтение на время
+записи. Прагмы из SQLITE_PRAGMAS включают WAL (читатели не ждут
+писателя), ожидание занятой базы вместо ошибки, отложенный fsync и
+чтение файла через mmap. Режим WAL хранится в самом файле базы, но
+остальные прагмы действуют только на соединение, поэтому применяются
+к каждому новому.
+
+execute_wrapper() ставит обёртку запросов сразу на все базы из
+DATABASES: с репликами чтение идёт не в default, и счётчики запросов
+по одному соединению видели бы только запись.
+"""
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def execute_wrapper(wrapper):
+    """connection.execute_wrapper для соединений всех баз."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(wrapper))
+        yield
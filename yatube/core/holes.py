@@ -0,0 +1,80 @@
+"""Личные фрагменты на общих страницах.
+
+Тег ``{% hole 'шаблон' имя=значение %}`` выводит вместо фрагмента,
+зависящего от посетителя, метку ``<!--hole:шаблон?имя=значение-->``.
+Остальная страница одинакова для всех, её можно отрисовать один раз
+и хранить в кэше. Перед отдачей fill() заменяет метки фрагментами,
+отрисованными для текущего запроса.
+
+Шаблон фрагмента регистрируется через register() вместе с функцией,
+которая собирает его контекст из строковых параметров метки. Метку
+не подделать текстом поста или комментария: шаблоны экранируют ``<``,
+а заполняются только HTML-ответы и только известные шаблоны.
+"""
+import re
+from contextlib import ExitStack
+from urllib.parse import parse_qsl, urlencode
+
+from django.template import RequestContext
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+MARK = b'<!--hole:'
+PLACEHOLDER = re.compile(rb'<!--hole:([^?>]+)\??([^>]*?)-->')
+
+_contexts = {}
+
+
+def register(template_name):
+    """Функция context(request, **params) для шаблона фрагмента."""
+    def decorator(func):
+        _contexts[template_name] = func
+        return func
+    return decorator
+
+
+def placeholder(template_name, **params):
+    query = urlencode(params)
+    return mark_safe(f'<!--hole:{template_name}?{query}-->')
+
+
+def fill(request, content):
+    """Подставляет в байты страницы фрагменты для этого запроса.
+
+    Метки незарегистрированных шаблонов остаются как есть. Все фрагменты
+    рисуются в одном RequestContext: контекст-процессоры выполняются
+    один раз на страницу, а не на каждую метку.
+    """
+    if MARK not in content:
+        return content
+    context = RequestContext(request)
+    with ExitStack() as stack:
+
+        def replace(match):
+            template_name = match.group(1).decode()
+            if template_name not in _contexts:
+                return match.group(0)
+            params = dict(parse_qsl(match.group(2).decode()))
+            template = get_template(template_name).template
+            if context.template is None:
+                # Привязка к первому шаблону запускает контекст-процессоры
+                stack.enter_context(context.bind_template(template))
+            with context.push(_contexts[template_name](request, **params)):
+                return template.render(context).encode()
+
+        return PLACEHOLDER.sub(replace, content)
+
+
+def fill_response(request, response):
+    """Заполняет метки в HTML-ответе; остальные ответы не трогает."""
+    if response.streaming:
+        return response
+    if not response.get('Content-Type', '').startswith('text/html'):
+        return response
+    response.content = fill(request, response.content)
+    return response
+
+
+@register('includes/user_menu.html')
+def user_menu(request):
+    return {}
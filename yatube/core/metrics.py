@@ -0,0 +1,264 @@
+"""Метрики сайта в текстовом формате Prometheus.
+
+Счётчики и гистограммы живут в памяти процесса. Если задан
+METRICS_DIR, каждый процесс не чаще раза в METRICS_FLUSH_SECONDS
+сбрасывает свои значения в файл ``<pid>.json`` этого каталога, а
+``/metrics`` суммирует файлы всех воркеров: ответ не зависит от того,
+какой воркер принял запрос. Каталог очищают при перезапуске сервиса,
+как и у prometheus_client.
+
+Попадания в кэш фрагментов считает тег cache из библиотеки
+fragment_cache (core/templatetags/fragment_cache.py).
+"""
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from core import db
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_lock = threading.Lock()
+_registry = {}
+_flushed = [float('-inf')]
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        with _lock:
+            if name in _registry:
+                raise ValueError(f'Метрика {name} уже объявлена')
+            _registry[name] = self
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'{self.name}: нужны метки {", ".join(self.labelnames)}'
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _copy(self, value):
+        return value
+
+    def snapshot(self):
+        with _lock:
+            values = [
+                [list(key), self._copy(value)]
+                for key, value in self._values.items()
+            ]
+        return {
+            'type': self.type,
+            'help': self.documentation,
+            'labelnames': list(self.labelnames),
+            'values': values,
+        }
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {
+                    'buckets': [0] * (len(self.buckets) + 1),
+                    'sum': 0,
+                    'count': 0,
+                }
+            index = next(
+                (i for i, bound in enumerate(self.buckets) if value <= bound),
+                len(self.buckets)
+            )
+            state['buckets'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def _copy(self, state):
+        return {**state, 'buckets': list(state['buckets'])}
+
+    def snapshot(self):
+        return {**super().snapshot(), 'bounds': list(self.buckets)}
+
+
+VIEW_LATENCY = Histogram(
+    'yatube_view_duration_seconds',
+    'Время ответа представления, секунды.',
+    ['view'],
+)
+RESPONSES = Counter(
+    'yatube_responses_total', 'Ответы по представлениям и кодам.',
+    ['view', 'status'],
+)
+DB_QUERIES = Counter(
+    'yatube_db_queries_total', 'Запросы к базе по представлениям.',
+    ['view'],
+)
+FRAGMENT_CACHE = Counter(
+    'yatube_fragment_cache_total',
+    'Обращения к кэшу фрагментов шаблонов.',
+    ['fragment', 'result'],
+)
+
+
+def snapshot():
+    with _lock:
+        metrics = list(_registry.values())
+    return {metric.name: metric.snapshot() for metric in metrics}
+
+
+def flush():
+    """Сбрасывает значения процесса в METRICS_DIR, если он задан."""
+    directory = settings.METRICS_DIR
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    handle, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(handle, 'w') as tmp:
+        json.dump(snapshot(), tmp)
+    os.replace(tmp_path, os.path.join(directory, f'{os.getpid()}.json'))
+
+
+def flush_periodically():
+    """flush(), если с прошлого сброса прошло METRICS_FLUSH_SECONDS."""
+    now = time.monotonic()
+    with _lock:
+        if now - _flushed[0] < settings.METRICS_FLUSH_SECONDS:
+            return
+        _flushed[0] = now
+    flush()
+
+
+def _merge(total, data):
+    for name, metric in data.items():
+        merged = total.setdefault(name, {**metric, 'values': {}})
+        for key, value in metric['values']:
+            key = tuple(key)
+            current = merged['values'].get(key)
+            if current is None:
+                merged['values'][key] = value
+            elif metric['type'] == 'histogram':
+                current['buckets'] = [
+                    a + b for a, b in zip(current['buckets'], value['buckets'])
+                ]
+                current['sum'] += value['sum']
+                current['count'] += value['count']
+            else:
+                merged['values'][key] = current + value
+
+
+def collect():
+    """Значения всех процессов, просуммированные по меткам."""
+    total = {}
+    if not settings.METRICS_DIR:
+        _merge(total, snapshot())
+        return total
+    flush()
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+        try:
+            with open(path) as source:
+                _merge(total, json.load(source))
+        except (OSError, ValueError):
+            # Файл удалили при перезапуске воркера.
+            continue
+    return total
+
+
+def _escape(value):
+    return (
+        value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+    )
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def _bound(value):
+    return '+Inf' if value == float('inf') else repr(float(value))
+
+
+def render():
+    """Текст для Prometheus по собранным значениям."""
+    lines = []
+    for name, metric in sorted(collect().items()):
+        lines.append(f'# HELP {name} {metric["help"]}')
+        lines.append(f'# TYPE {name} {metric["type"]}')
+        names = metric['labelnames']
+        for key, value in sorted(metric['values'].items()):
+            if metric['type'] != 'histogram':
+                lines.append(f'{name}{_labels(names, key)} {value}')
+                continue
+            cumulative = 0
+            bounds = metric['bounds'] + [float('inf')]
+            for bound, count in zip(bounds, value['buckets']):
+                cumulative += count
+                labels = _labels(names, key, [('le', _bound(bound))])
+                lines.append(f'{name}_bucket{labels} {cumulative}')
+            lines.append(f'{name}_sum{_labels(names, key)} {value["sum"]}')
+            lines.append(
+                f'{name}_count{_labels(names, key)} {value["count"]}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = _QueryCounter()
+        started = time.perf_counter()
+        with db.execute_wrapper(queries):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        VIEW_LATENCY.observe(elapsed, view=view)
+        RESPONSES.inc(view=view, status=response.status_code)
+        DB_QUERIES.inc(queries.count, view=view)
+        flush_periodically()
+        return response
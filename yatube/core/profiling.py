@@ -0,0 +1,230 @@
+"""Профилирование отдельных запросов на работающем сайте.
+
+ProfilingMiddleware профилирует долю PROFILING_SAMPLE_RATE запросов,
+а также любой запрос с подписанным заголовком X-Profile (токен
+выдаёт страница профилей в админке). Для такого запроса собираются
+статистика cProfile, время SQL-запросов, время отрисовки шаблонов и
+попадания в кэш. Последние PROFILING_BUFFER_SIZE профилей процесса
+хранятся в кольцевом буфере; остальные запросы идут без накладных
+расходов.
+"""
+import cProfile
+import io
+import itertools
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.template import base as template_base
+
+from core import db
+
+HEADER = 'HTTP_X_PROFILE'
+SALT = 'core.profiling'
+TOKEN_VALUE = 'profile'
+TOKEN_MAX_AGE = 60 * 60
+TOP_FUNCTIONS = 30
+SLOWEST_QUERIES = 10
+# Кэши, к которым обращается код сайта (уровни TieredCache не считаем)
+CACHE_ALIASES = ('default', 'template_fragments')
+
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_buffer = deque(maxlen=settings.PROFILING_BUFFER_SIZE)
+_state = threading.local()
+
+
+def token():
+    """Подписанное значение заголовка X-Profile, живёт TOKEN_MAX_AGE."""
+    return signing.TimestampSigner(salt=SALT).sign(TOKEN_VALUE)
+
+
+def _signed(request):
+    value = request.META.get(HEADER)
+    if not value:
+        return False
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            value, max_age=TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def profiles():
+    """Сохранённые профили, новые первыми."""
+    with _lock:
+        return list(reversed(_buffer))
+
+
+def get_profile(profile_id):
+    return next(
+        (item for item in profiles() if item['id'] == profile_id), None
+    )
+
+
+def clear():
+    with _lock:
+        _buffer.clear()
+
+
+class Profile:
+    def __init__(self):
+        self.queries = []
+        self.template_ms = 0
+        self.templates = 0
+        self.depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, (time.perf_counter() - started) * 1000)
+            )
+
+
+_render = template_base.Template.render
+_timers = 0
+
+
+def _timed_render(self, context):
+    """Template.render с замером времени для профилируемого запроса."""
+    profile = getattr(_state, 'profile', None)
+    if profile is None:
+        return _render(self, context)
+    profile.depth += 1
+    started = time.perf_counter()
+    try:
+        return _render(self, context)
+    finally:
+        profile.depth -= 1
+        profile.templates += 1
+        if not profile.depth:
+            profile.template_ms += (time.perf_counter() - started) * 1000
+
+
+@contextmanager
+def _timing_templates():
+    """Подменяет Template.render, пока идёт профилируемый запрос.
+
+    Остальное время шаблоны отрисовываются без обёртки. Запросы других
+    потоков, попавшие в это время, проходят обёртку без замера.
+    """
+    global _timers
+    with _lock:
+        if not _timers:
+            template_base.Template.render = _timed_render
+        _timers += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _timers -= 1
+            if not _timers:
+                template_base.Template.render = _render
+
+
+_MISSING = object()
+
+
+def _count_cache(cache, profile):
+    """Подменяет get и get_many экземпляра кэша счётчиками попаданий.
+
+    Экземпляры кэша у каждого потока свои, поэтому подмена не задевает
+    другие запросы.
+    """
+    get, get_many = cache.get, cache.get_many
+
+    def counted_get(key, default=None, version=None):
+        value = get(key, _MISSING, version=version)
+        if value is _MISSING:
+            profile.cache_misses += 1
+            return default
+        profile.cache_hits += 1
+        return value
+
+    def counted_get_many(keys, version=None):
+        keys = list(keys)
+        found = get_many(keys, version=version)
+        profile.cache_hits += len(found)
+        profile.cache_misses += len(keys) - len(found)
+        return found
+
+    cache.get, cache.get_many = counted_get, counted_get_many
+
+
+def _stats_text(profiler):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def should_profile(self, request):
+        rate = settings.PROFILING_SAMPLE_RATE
+        return (rate and random.random() < rate) or _signed(request)
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        profile = Profile()
+        aliases = [
+            alias for alias in CACHE_ALIASES if alias in settings.CACHES
+        ]
+        for alias in aliases:
+            _count_cache(caches[alias], profile)
+        profiler = cProfile.Profile()
+        _state.profile = profile
+        started = time.perf_counter()
+        try:
+            with db.execute_wrapper(profile), _timing_templates():
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+        finally:
+            _state.profile = None
+            for alias in aliases:
+                vars(caches[alias]).pop('get', None)
+                vars(caches[alias]).pop('get_many', None)
+        total_ms = (time.perf_counter() - started) * 1000
+        self.store(request, response, profile, profiler, total_ms)
+        return response
+
+    def store(self, request, response, profile, profiler, total_ms):
+        match = request.resolver_match
+        slowest = sorted(profile.queries, key=lambda query: -query[1])
+        with _lock:
+            _buffer.append({
+                'id': next(_ids),
+                'created': time.time(),
+                'method': request.method,
+                'path': request.get_full_path(),
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+                'total_ms': total_ms,
+                'sql_count': len(profile.queries),
+                'sql_ms': sum(ms for _, ms in profile.queries),
+                'slowest_queries': slowest[:SLOWEST_QUERIES],
+                'template_ms': profile.template_ms,
+                'templates': profile.templates,
+                'cache_hits': profile.cache_hits,
+                'cache_misses': profile.cache_misses,
+                'stats': _stats_text(profiler),
+            })
@@ -0,0 +1,137 @@
+"""Чтение с реплик базы, запись — в основную базу.
+
+ReplicaRouter отправляет чтение на случайную реплику из
+DATABASE_REPLICAS, а запись и миграции — в default. Реплика может
+отставать, поэтому пользователь, который только что что-то записал,
+DATABASE_PIN_SECONDS секунд читает с основной базы: ReplicaMiddleware
+закрепляет за основной базой запросы с небезопасным методом и ставит
+cookie, которая держит закрепление на время отставания. Представление,
+которое пишет в ответ на GET, отмечается декоратором pin_writes, а код,
+читающий сразу после записи (сигналы моделей), — декоратором
+on_primary.
+
+Остальные посетители в это время читают реплику и могут увидеть
+старые строки. Такой ответ нельзя класть в общий кэш: там он остался
+бы под новым поколением данных. Код, который знает время последнего
+изменения страницы, отмечает запрос через note_change(), а кэши
+фрагментов и страниц спрашивают cacheable().
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.apps import apps
+from django.conf import settings
+
+PRIMARY = 'default'
+PIN_COOKIE = 'db_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_state = threading.local()
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+@contextmanager
+def pinned():
+    """Внутри блока всё чтение идёт в основную базу."""
+    outer = is_pinned()
+    _state.pinned = True
+    try:
+        yield
+    finally:
+        _state.pinned = outer
+
+
+def on_primary(func):
+    """Всё чтение внутри func идёт в основную базу."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with pinned():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _pin_reader(response):
+    response.set_cookie(
+        PIN_COOKIE, '1', max_age=settings.DATABASE_PIN_SECONDS,
+        httponly=True, samesite='Lax'
+    )
+
+
+def pin_writes(view):
+    """Закрепляет за основной базой представление, которое пишет на GET.
+
+    Middleware узнаёт запись только по методу запроса; такое
+    представление само читает основную базу и ставит cookie закрепления.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with pinned():
+            response = view(request, *args, **kwargs)
+        if settings.DATABASE_REPLICAS:
+            _pin_reader(response)
+        return response
+    return wrapper
+
+
+def may_lag(changed):
+    """Могла ли реплика ещё не получить запись, сделанную в changed.
+
+    changed — время записи в секундах; закреплённое чтение не отстаёт.
+    """
+    return (
+        bool(settings.DATABASE_REPLICAS)
+        and not is_pinned()
+        and time.time() - changed < settings.DATABASE_PIN_SECONDS
+    )
+
+
+def note_change(request, changed):
+    """Отмечает запрос, если его данные менялись в changed (секунды)."""
+    if may_lag(changed):
+        request._replica_lag = True
+
+
+def cacheable(request):
+    """Можно ли класть ответ запроса в общий кэш."""
+    return not getattr(request, '_replica_lag', False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        # Исторические модели миграций читают базу, которую мигрируют.
+        if not replicas or is_pinned() or model._meta.apps is not apps:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        writing = request.method not in SAFE_METHODS
+        if not (writing or PIN_COOKIE in request.COOKIES):
+            return self.get_response(request)
+        with pinned():
+            response = self.get_response(request)
+        if writing:
+            _pin_reader(response)
+        return response
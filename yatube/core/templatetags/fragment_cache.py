@@ -0,0 +1,55 @@
+"""Тег cache, который считает попадания в кэш фрагментов.
+
+Подключается вместо встроенной библиотеки: ``{% load fragment_cache %}``.
+Синтаксис тот же, что у ``{% cache %}`` из django.templatetags.cache.
+Запрос, который мог прочитать отстающую реплику, отрисовывает
+фрагменты без кэша (см. core.routers.cacheable).
+"""
+import threading
+
+from django import template
+from django.template import NodeList
+from django.templatetags.cache import CacheNode, do_cache
+
+from core import metrics, routers
+
+register = template.Library()
+
+_state = threading.local()
+
+
+class _MissNodeList(NodeList):
+    """Содержимое {% cache %}: отрисовывается только при промахе."""
+
+    def render(self, context):
+        _state.missed = True
+        return super().render(context)
+
+
+class CountedCacheNode(CacheNode):
+    def render(self, context):
+        request = context.get('request')
+        if request is not None and not routers.cacheable(request):
+            metrics.FRAGMENT_CACHE.inc(
+                fragment=self.fragment_name, result='bypass'
+            )
+            return self.nodelist.render(context)
+        outer = getattr(_state, 'missed', False)
+        _state.missed = False
+        try:
+            return super().render(context)
+        finally:
+            result = 'miss' if _state.missed else 'hit'
+            metrics.FRAGMENT_CACHE.inc(
+                fragment=self.fragment_name, result=result
+            )
+            _state.missed = outer
+
+
+@register.tag('cache')
+def do_counted_cache(parser, token):
+    node = do_cache(parser, token)
+    return CountedCacheNode(
+        _MissNodeList(node.nodelist), node.expire_time_var,
+        node.fragment_name, node.vary_on, node.cache_name
+    )
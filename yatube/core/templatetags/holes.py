@@ -0,0 +1,11 @@
+from django import template
+
+from core import holes
+
+register = template.Library()
+
+
+@register.simple_tag
+def hole(template_name, **params):
+    """Метка личного фрагмента, см. core/holes.py."""
+    return holes.placeholder(template_name, **params)
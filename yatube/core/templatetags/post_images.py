@@ -0,0 +1,16 @@
+from django import template
+from django.templatetags.static import static
+
+from posts.thumbnails import thumbnail_url
+
+PLACEHOLDER = 'img/thumbnail-placeholder.svg'
+
+register = template.Library()
+
+
+@register.simple_tag
+def feed_thumbnail(image):
+    """Адрес миниатюры картинки поста; пока её режут — заглушки."""
+    if not image:
+        return ''
+    return thumbnail_url(image) or static(PLACEHOLDER)
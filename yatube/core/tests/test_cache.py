@@ -0,0 +1,89 @@
+import threading
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import LOCK_PREFIX, TieredCache
+
+SHARED = {
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tiered-tests',
+    },
+}
+
+
+@override_settings(CACHES={'default': SHARED['shared'], **SHARED})
+class TieredCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.cache = TieredCache('tiered-local', {'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_TIMEOUT': 60,
+            'SHARED_ONLY': ['version:'],
+            'LOCK_TIMEOUT': 1,
+            'LOCK_POLL': 0.01,
+        }})
+        self.cache.clear()
+        self.shared = caches['shared']
+
+    def test_writes_reach_shared_store(self):
+        """Запись видна в общем хранилище"""
+        self.cache.set('key', 'value')
+        self.assertEqual(self.shared.get('key'), 'value')
+
+    def test_local_tier_serves_hot_keys(self):
+        """Горячий ключ читается из памяти процесса"""
+        self.cache.set('key', 'value')
+        self.shared.set('key', 'changed_elsewhere')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.cache.delete('key')
+        self.assertIsNone(self.shared.get('key'))
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_shared_only_keys_skip_local_tier(self):
+        """Ключи из SHARED_ONLY всегда читаются из общего хранилища"""
+        self.cache.set('version:index', 1)
+        self.shared.set('version:index', 2)
+        self.assertEqual(self.cache.get('version:index'), 2)
+        self.assertEqual(self.cache.get_many(['version:index']), {
+            'version:index': 2
+        })
+
+    def test_incr_drops_local_copy(self):
+        """incr меняет общее значение и забывает локальную копию"""
+        self.cache.set('count', 1)
+        self.cache.incr('count')
+        self.assertEqual(self.cache.get('count'), 2)
+
+    def test_get_or_set_computes_once(self):
+        """При промахе значение считается один раз"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 42
+
+        self.assertEqual(self.cache.get_or_set('answer', compute), 42)
+        self.assertEqual(self.cache.get_or_set('answer', compute), 42)
+        self.assertEqual(len(calls), 1)
+
+    def test_get_or_set_waits_for_lock_holder(self):
+        """Пока значение считает другой процесс, остальные его ждут"""
+        self.shared.add(LOCK_PREFIX + 'answer', 1)
+        timer = threading.Timer(0.05, self.shared.set, ('answer', 42))
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertEqual(
+            self.cache.get_or_set('answer', lambda: self.fail('computed')),
+            42
+        )
+
+
+class DefaultCacheTest(SimpleTestCase):
+    def test_keeps_more_than_default_entries(self):
+        """Кэш по умолчанию не вытесняет записи после трёхсот"""
+        cache = caches['default']
+        keys = [f'tests:entry:{i}' for i in range(1000)]
+        cache.set_many(dict.fromkeys(keys, 1))
+        self.addCleanup(cache.delete_many, keys)
+        self.assertEqual(len(cache.get_many(keys)), len(keys))
@@ -0,0 +1,33 @@
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import TestCase
+
+
+class SqlitePragmasTest(TestCase):
+    def pragma(self, cursor, name):
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+    def test_connection_pragmas(self):
+        """Прагмы применяются к каждому соединению"""
+        with connection.cursor() as cursor:
+            self.assertEqual(self.pragma(cursor, 'busy_timeout'), 5000)
+            # 1 — NORMAL
+            self.assertEqual(self.pragma(cursor, 'synchronous'), 1)
+
+    def test_file_database_uses_wal(self):
+        """Файловая база переходит в режим WAL"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        wrapper = DatabaseWrapper({
+            **connection.settings_dict,
+            'NAME': os.path.join(directory, 'wal.sqlite3'),
+        }, alias='wal_test')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            self.assertEqual(self.pragma(cursor, 'journal_mode'), 'wal')
+            self.assertGreater(self.pragma(cursor, 'mmap_size'), 0)
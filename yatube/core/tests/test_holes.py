@@ -0,0 +1,36 @@
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, TestCase
+
+from core import holes
+
+
+class HolesTest(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.request.user = AnonymousUser()
+
+    def test_fill_renders_registered_templates(self):
+        """Метка известного шаблона заменяется фрагментом"""
+        content = 'до {} после'.format(
+            holes.placeholder('includes/user_menu.html')
+        ).encode()
+        filled = holes.fill(self.request, content).decode()
+        self.assertNotIn('<!--hole:', filled)
+        self.assertIn('Войти', filled)
+        self.assertTrue(filled.startswith('до '))
+
+    def test_unknown_templates_kept(self):
+        """Метка незарегистрированного шаблона остаётся как есть"""
+        content = holes.placeholder('users/login.html', next='/').encode()
+        self.assertEqual(holes.fill(self.request, content), content)
+
+    def test_only_html_responses_filled(self):
+        """JSON с текстом метки не заполняется"""
+        mark = str(holes.placeholder('includes/user_menu.html'))
+        response = holes.fill_response(
+            self.request, JsonResponse({'text': mark})
+        )
+        self.assertNotIn('Войти', response.content.decode())
+        response = holes.fill_response(self.request, HttpResponse(mark))
+        self.assertIn('Войти', response.content.decode())
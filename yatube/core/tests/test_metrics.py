@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+def value(name, *labels):
+    return metrics.collect()[name]['values'].get(labels, 0)
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_view_latency_and_queries(self):
+        """Запрос попадает в гистограмму и счётчик запросов к базе"""
+        name = 'yatube_view_duration_seconds'
+        before = value(name, 'posts:index') or {'count': 0}
+        queries = value('yatube_db_queries_total', 'posts:index')
+        self.client.get(reverse('posts:index'))
+        after = value(name, 'posts:index')
+        self.assertEqual(after['count'], before['count'] + 1)
+        self.assertGreater(
+            value('yatube_db_queries_total', 'posts:index'), queries
+        )
+
+    @override_settings(PAGE_CACHE_SECONDS=0)
+    def test_main_page_fragment_hits(self):
+        """Промахи и попадания фрагмента main_page считаются"""
+        name = 'yatube_fragment_cache_total'
+        misses = value(name, 'main_page', 'miss')
+        hits = value(name, 'main_page', 'hit')
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(value(name, 'main_page', 'miss'), misses + 1)
+        self.assertEqual(value(name, 'main_page', 'hit'), hits + 1)
+
+    def test_follow_operations(self):
+        """Подписки и отписки считаются"""
+        name = 'yatube_follows_total'
+        follows = value(name, 'follow')
+        unfollows = value(name, 'unfollow')
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.filter(user=self.user).delete()
+        self.assertEqual(value(name, 'follow'), follows + 1)
+        self.assertEqual(value(name, 'unfollow'), unfollows + 1)
+
+    def test_endpoint_sums_worker_files(self):
+        """/metrics суммирует значения всех воркеров"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        worker = {
+            'yatube_follows_total': {
+                'type': 'counter',
+                'help': 'Подписки и отписки.',
+                'labelnames': ['action'],
+                'values': [[['follow'], 1000]],
+            },
+        }
+        with open(os.path.join(directory, '1.json'), 'w') as source:
+            json.dump(worker, source)
+        self.client.get(reverse('posts:index'))
+        own = value('yatube_follows_total', 'follow')
+        with override_settings(METRICS_DIR=directory):
+            response = self.client.get(reverse('metrics'))
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertContains(
+            response, f'yatube_follows_total{{action="follow"}} {own + 1000}'
+        )
+        self.assertContains(
+            response,
+            'yatube_view_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"}'
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(directory, f'{os.getpid()}.json'))
+        )
+
+    def test_endpoint_is_internal(self):
+        """/metrics закрыт для чужих адресов, кроме персонала"""
+        url = reverse('metrics')
+        response = self.client.get(url, REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(response.status_code, 403)
+        self.client.force_login(
+            User.objects.create_user(username='admin', is_staff=True)
+        )
+        response = self.client.get(url, REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_FLUSH_SECONDS=60 * 60)
+    def test_flush_is_periodic(self):
+        """Процесс пишет файл метрик не на каждый запрос"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with override_settings(METRICS_DIR=directory):
+            metrics._flushed[0] = float('-inf')
+            self.client.get(reverse('posts:index'))
+            self.assertTrue(os.path.exists(path))
+            os.remove(path)
+            self.client.get(reverse('posts:index'))
+            self.assertFalse(os.path.exists(path))
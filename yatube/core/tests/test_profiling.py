@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.base import Template
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+from posts.models import Post
+
+User = get_user_model()
+
+
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.admin = User.objects.create_user(
+            username='admin', is_staff=True
+        )
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        profiling.clear()
+        self.staff_client = Client()
+        self.staff_client.force_login(self.admin)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_not_sampled_requests_are_skipped(self):
+        """Без выборки и заголовка запрос не профилируется"""
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(profiling.profiles(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_is_profiled(self):
+        """Профиль содержит SQL, шаблоны, кэш и cProfile"""
+        self.client.get(reverse('posts:index'))
+        profile, = profiling.profiles()
+        self.assertEqual(profile['view'], 'posts:index')
+        self.assertEqual(profile['status'], 200)
+        self.assertGreater(profile['sql_count'], 0)
+        self.assertGreater(profile['template_ms'], 0)
+        self.assertGreater(profile['cache_misses'], 0)
+        self.assertIn('function calls', profile['stats'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_render_hook_only_while_profiling(self):
+        """Замер шаблонов подключается только на профилируемый запрос"""
+        render = Template.render
+        self.client.get(reverse('posts:index'))
+        self.assertIs(Template.render, render)
+        self.assertIsNot(render, profiling._timed_render)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_signed_header_enables_profiling(self):
+        """Подписанный заголовок включает профилирование запроса"""
+        self.client.get(reverse('posts:index'), HTTP_X_PROFILE='подделка')
+        self.assertEqual(profiling.profiles(), [])
+        self.client.get(
+            reverse('posts:index'), HTTP_X_PROFILE=profiling.token()
+        )
+        self.assertEqual(len(profiling.profiles()), 1)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_profiles_page_is_staff_only(self):
+        """Страница профилей доступна только персоналу"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('core:profiles'))
+        self.assertEqual(response.status_code, 302)
+        self.staff_client.get(
+            reverse('posts:index'), HTTP_X_PROFILE=profiling.token()
+        )
+        profile, = profiling.profiles()
+        response = self.staff_client.get(reverse('core:profiles'))
+        self.assertContains(response, reverse('posts:index'))
+        response = self.staff_client.get(
+            reverse('core:profile_detail', args=(profile['id'],))
+        )
+        self.assertContains(response, 'cProfile')
+        response = self.staff_client.get(
+            reverse('core:profile_detail', args=(profile['id'] + 1,))
+        )
+        self.assertEqual(response.status_code, 404)
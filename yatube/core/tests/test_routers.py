@@ -0,0 +1,137 @@
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import db, metrics, routers
+from posts.models import Post, User
+
+REPLICAS = ['replica_1', 'replica_2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, DATABASE_PIN_SECONDS=5)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        self.factory = RequestFactory()
+        self.reads = []
+
+        def view(request):
+            self.reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        self.middleware = routers.ReplicaMiddleware(view)
+
+    def test_reads_go_to_replicas(self):
+        """Чтение — с реплик, запись — в основную базу"""
+        self.assertIn(self.router.db_for_read(Post), REPLICAS)
+        self.assertEqual(self.router.db_for_write(Post), routers.PRIMARY)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик всё идёт в основную базу"""
+        self.assertEqual(self.router.db_for_read(Post), routers.PRIMARY)
+        response = self.middleware(self.factory.post('/create/'))
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_write_pins_reader(self):
+        """После записи пользователь читает с основной базы"""
+        response = self.middleware(self.factory.post('/create/'))
+        self.assertEqual(self.reads, [routers.PRIMARY])
+        cookie = response.cookies[routers.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 5)
+        request = self.factory.get('/')
+        request.COOKIES[routers.PIN_COOKIE] = cookie.value
+        response = self.middleware(request)
+        self.assertEqual(self.reads[-1], routers.PRIMARY)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+        self.middleware(self.factory.get('/'))
+        self.assertIn(self.reads[-1], REPLICAS)
+        self.assertFalse(routers.is_pinned())
+
+    def test_get_view_that_writes_pins_reader(self):
+        """Представление с pin_writes закрепляет и запрос, и читателя"""
+        def view(request):
+            self.reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = routers.pin_writes(view)(self.factory.get('/follow/'))
+        self.assertEqual(self.reads, [routers.PRIMARY])
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+    def test_on_primary(self):
+        """Функция под on_primary читает основную базу"""
+        read = routers.on_primary(lambda: self.router.db_for_read(Post))
+        self.assertEqual(read(), routers.PRIMARY)
+        self.assertFalse(routers.is_pinned())
+
+    def test_pinned_block(self):
+        """Внутри pinned чтение идёт в основную базу"""
+        with routers.pinned():
+            self.assertEqual(self.router.db_for_read(Post), routers.PRIMARY)
+        self.assertIn(self.router.db_for_read(Post), REPLICAS)
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica_1'], DATABASE_PIN_SECONDS=60
+)
+class ReplicaDatabaseTest(TransactionTestCase):
+    """Реплика — второе соединение к той же тестовой базе."""
+
+    def setUp(self):
+        connections.databases['replica_1'] = dict(
+            connections['default'].settings_dict
+        )
+        self.addCleanup(self.drop_replica)
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(text='Тестовый пост', author=self.author)
+
+    def drop_replica(self):
+        connections['replica_1'].close()
+        del connections.databases['replica_1']
+        delattr(connections._connections, 'replica_1')
+
+    def test_queries_counted_on_every_alias(self):
+        """Запросы к реплике тоже видны счётчикам"""
+        aliases = []
+
+        def record(execute, sql, params, many, context):
+            aliases.append(context['connection'].alias)
+            return execute(sql, params, many, context)
+
+        before = metrics.collect()['yatube_db_queries_total'][
+            'values'
+        ].get(('posts:index',), 0)
+        with db.execute_wrapper(record):
+            self.client.get(reverse('posts:index'))
+        self.assertIn('replica_1', aliases)
+        after = metrics.collect()['yatube_db_queries_total'][
+            'values'
+        ][('posts:index',)]
+        self.assertEqual(after - before, len(aliases))
+
+    def test_fresh_changes_are_not_cached(self):
+        """Отрисовка с реплики сразу после изменения не кэшируется"""
+        url = reverse('posts:index')
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertTemplateUsed(response, 'posts/index.html')
+        self.assertContains(response, 'Тестовый пост')
+        with override_settings(DATABASE_PIN_SECONDS=0):
+            self.client.get(url)
+            response = self.client.get(url)
+        self.assertIsNone(response.context)
+
+    def test_follow_link_pins_reader(self):
+        """Подписка по ссылке закрепляет читателя за основной базой"""
+        reader = User.objects.create_user(username='reader')
+        self.client.force_login(reader)
+        response = self.client.get(
+            reverse('posts:profile_follow', args=(self.author.username,))
+        )
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Тестовый пост')
@@ -0,0 +1,47 @@
+import os
+
+from django.conf import settings
+from django.template import engines
+from django.template.base import Template
+from django.test import SimpleTestCase, override_settings
+
+from core.warmup import warm_templates
+
+CACHED_TEMPLATES = [{
+    **settings.TEMPLATES[0],
+    'OPTIONS': {
+        **settings.TEMPLATES[0]['OPTIONS'],
+        'loaders': [(
+            'django.template.loaders.cached.Loader',
+            settings.TEMPLATE_LOADERS
+        )],
+    },
+}]
+
+
+class WarmupTest(SimpleTestCase):
+    def test_without_cached_loader(self):
+        """Без кэширующего загрузчика прогревать нечего"""
+        self.assertEqual(warm_templates(), 0)
+
+    @override_settings(TEMPLATES=CACHED_TEMPLATES)
+    def test_compiles_every_template(self):
+        """Все шаблоны из templates/ компилируются заранее"""
+        count = sum(
+            len(files) for _, _, files in os.walk(settings.TEMPLATES_DIR)
+        )
+        self.assertEqual(warm_templates(), count)
+        compile_nodelist = Template.compile_nodelist
+        compiled = []
+
+        def counted(template):
+            compiled.append(template.name)
+            return compile_nodelist(template)
+
+        Template.compile_nodelist = counted
+        try:
+            engines['django'].get_template('posts/index.html')
+            engines['django'].get_template('posts/includes/paginator.html')
+        finally:
+            Template.compile_nodelist = compile_nodelist
+        self.assertEqual(compiled, [])
@@ -1,6 +1,12 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
 from http import HTTPStatus
 
+from . import metrics as site_metrics
+from . import profiling
+
 
 def page_not_found(request, exception):
     return render(
@@ -13,3 +19,33 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def profiles(request):
+    context = {
+        'profiles': profiling.profiles(),
+        'token': profiling.token(),
+        'sample_rate': settings.PROFILING_SAMPLE_RATE,
+    }
+    return render(request, 'core/profiles.html', context)
+
+
+@staff_member_required
+def profile_detail(request, profile_id):
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise Http404
+    return render(request, 'core/profile_detail.html', {'profile': profile})
+
+
+def metrics(request):
+    """Метрики для Prometheus: адресам METRICS_ALLOWED_IPS и персоналу."""
+    if not (
+        request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+        or request.user.is_staff
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        site_metrics.render(), content_type=site_metrics.CONTENT_TYPE
+    )
@@ -0,0 +1,44 @@
+"""Компиляция шаблонов при старте процесса.
+
+Кэширующий загрузчик разбирает шаблон при первом обращении, и без
+прогрева эту цену платят первые запросы каждого воркера. Прогрев
+компилирует все шаблоны из DIRS заранее, включая частичные шаблоны
+для {% include %}: дальше запросы берут готовые из памяти.
+"""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+from django.template.loaders.cached import Loader as CachedLoader
+
+logger = logging.getLogger(__name__)
+
+
+def _template_names(directory):
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            path = os.path.relpath(os.path.join(root, filename), directory)
+            yield path.replace(os.sep, '/')
+
+
+def warm_templates():
+    """Компилирует шаблоны движков с кэшем; возвращает их число."""
+    count = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        if not any(
+            isinstance(loader, CachedLoader)
+            for loader in engine.engine.template_loaders
+        ):
+            continue
+        for directory in engine.engine.dirs:
+            for name in _template_names(directory):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError:
+                    logger.exception('Не удалось скомпилировать %s', name)
+                    continue
+                count += 1
+    return count
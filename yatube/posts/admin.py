@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Group, Post, Comment
 
 
@@ -11,6 +12,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по индексу вместо LIKE '%...%' по всей таблице."""
+        if not search_term.strip():
+            return queryset, False
+        return search.search(queryset, search_term), False
+
 
 admin.site.register(Group)
 
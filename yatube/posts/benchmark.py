@@ -0,0 +1,293 @@
+"""Нагрузочный замер всех адресов приложения posts.
+
+seed() заполняет базу синтетическими данными заданного размера:
+пользователи, сообщества, посты (часть с картинкой), комментарии и
+граф подписок. Записи создаются пачками через bulk_create, а
+производные данные затем пересобираются (см. posts.transfer.rebuild).
+
+measure() обходит адреса чтения из posts/urls.py (кроме WRITE_ROUTES:
+их GET либо меняет данные, либо лишь показывает форму) и для каждого
+считает задержку (p50/p95/p99), число запросов к базе и размер
+ответа. Первый запрос с пустым кэшем замеряется отдельно. Результат —
+словарь, который команда benchmark сохраняет в JSON для сравнения
+между коммитами.
+
+template_cost() показывает, сколько шаблонов разбирается за полную
+отрисовку каждой ленты и во что это обходится, без кэша шаблонов и с
+прогретым кэширующим загрузчиком.
+"""
+import random
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template.base import Template
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from faker import Faker
+
+from core import db
+from core.warmup import warm_templates
+
+from . import transfer
+from .models import Comment, Follow, Group, Post, User
+from .urls import app_name, urlpatterns
+
+BATCH_SIZE = 1000
+PASSWORD = 'benchmark'
+IMAGE_NAME = 'posts/benchmark.gif'
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+PERCENTILES = (50, 95, 99)
+FEED_ROUTES = ('index', 'group_posts', 'profile', 'follow_index')
+# Адреса записи: замер GET по ним ничего не говорит о чтении, а
+# подписка ещё и меняет граф подписок между замерами
+WRITE_ROUTES = (
+    'post_create', 'post_edit', 'add_comment',
+    'profile_follow', 'profile_unfollow',
+)
+
+
+@dataclass
+class Dataset:
+    users: int = 50
+    groups: int = 10
+    posts: int = 2000
+    comments: int = 5000
+    follows: int = 10
+    image_ratio: float = 0.2
+    seed: int = 0
+
+
+def _chunks(objects):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk(model, objects):
+    for batch in _chunks(objects):
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def seed(dataset):
+    """Заполняет базу данными размера dataset."""
+    fake = Faker('ru_RU')
+    fake.seed_instance(dataset.seed)
+    rand = random.Random(dataset.seed)
+    password = make_password(PASSWORD)
+    _bulk(User, (
+        User(username=f'user{i}', password=password,
+             first_name=fake.first_name(), last_name=fake.last_name())
+        for i in range(dataset.users)
+    ))
+    _bulk(Group, (
+        Group(title=fake.sentence(nb_words=2)[:200], slug=f'group-{i}',
+              description=fake.paragraph())
+        for i in range(dataset.groups)
+    ))
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    group_ids = list(Group.objects.values_list('pk', flat=True)) + [None]
+    if dataset.image_ratio and not default_storage.exists(IMAGE_NAME):
+        default_storage.save(IMAGE_NAME, ContentFile(SMALL_GIF))
+    _bulk(Post, (
+        Post(
+            text=fake.paragraph(nb_sentences=5),
+            author_id=rand.choice(user_ids),
+            group_id=rand.choice(group_ids),
+            image=IMAGE_NAME if rand.random() < dataset.image_ratio else '',
+        )
+        for _ in range(dataset.posts)
+    ))
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    if post_ids:
+        _bulk(Comment, (
+            Comment(
+                post_id=rand.choice(post_ids),
+                author_id=rand.choice(user_ids),
+                text=fake.sentence(),
+            )
+            for _ in range(dataset.comments)
+        ))
+    _bulk(Follow, (
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id in user_ids
+        for author_id in rand.sample(
+            user_ids, min(dataset.follows, len(user_ids))
+        )
+        if author_id != user_id
+    ))
+    transfer.rebuild()
+
+
+def percentile(values, percent):
+    """Значение по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def _sample_kwargs():
+    post = Post.objects.order_by('-comments_count', '-pk').first()
+    group = Group.objects.order_by('-posts_count').first()
+    return {
+        'post_id': post.pk,
+        'slug': group.slug,
+        'username': post.author.username,
+    }, post.author
+
+
+def routes():
+    """Адреса чтения posts/urls.py с подставленными параметрами."""
+    kwargs, author = _sample_kwargs()
+    result = {}
+    for pattern in urlpatterns:
+        if pattern.name in WRITE_ROUTES:
+            continue
+        names = pattern.pattern.converters
+        result[pattern.name] = reverse(
+            f'{app_name}:{pattern.name}',
+            kwargs={name: kwargs[name] for name in names}
+        )
+    word = Post.objects.values_list('text', flat=True).first().split()[0]
+    result['post_search'] += f'?q={word}'
+    return result, author
+
+
+def _request(client, url):
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with db.execute_wrapper(record):
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - started
+    return elapsed * 1000, len(queries), len(response.content), response
+
+
+def measure(requests=50, warmup=5):
+    """Замеряет каждый адрес от имени автора самого популярного поста."""
+    urls, author = routes()
+    client = Client()
+    client.force_login(author)
+    results = {}
+    for name, url in urls.items():
+        cache.clear()
+        cold_ms, cold_queries, _, _ = _request(client, url)
+        for _ in range(warmup):
+            client.get(url)
+        timings, queries, sizes = [], [], []
+        for _ in range(requests):
+            elapsed, count, size, response = _request(client, url)
+            timings.append(elapsed)
+            queries.append(count)
+            sizes.append(size)
+        result = {
+            'url': url,
+            'status': response.status_code,
+            'requests': requests,
+            'cold_ms': round(cold_ms, 3),
+            'cold_queries': cold_queries,
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries': max(queries),
+            'bytes': max(sizes),
+        }
+        for percent in PERCENTILES:
+            result[f'p{percent}_ms'] = round(percentile(timings, percent), 3)
+        results[name] = result
+    return results
+
+
+@contextmanager
+def _counting_compiles():
+    """Считает разобранные шаблоны внутри блока."""
+    compiled = [0]
+    compile_nodelist = Template.compile_nodelist
+
+    def counted(self):
+        compiled[0] += 1
+        return compile_nodelist(self)
+
+    Template.compile_nodelist = counted
+    try:
+        yield compiled
+    finally:
+        Template.compile_nodelist = compile_nodelist
+
+
+def _templates(cached):
+    loaders = settings.TEMPLATE_LOADERS
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    template = settings.TEMPLATES[0]
+    return [{
+        **template,
+        'OPTIONS': {**template['OPTIONS'], 'loaders': loaders},
+    }]
+
+
+def template_cost(requests=20):
+    """Разбор шаблонов в лентах без кэша шаблонов и с прогретым кэшем.
+
+    Кэш страниц выключен, а общий кэш очищается перед каждым запросом:
+    иначе страницу или фрагменты отдал бы кэш и шаблоны ленты вовсе не
+    отрисовывались бы.
+    """
+    urls, author = routes()
+    client = Client()
+    client.force_login(author)
+    results = {name: {'url': urls[name]} for name in FEED_ROUTES}
+    for mode in ('uncached', 'cached'):
+        with override_settings(
+            TEMPLATES=_templates(mode == 'cached'), PAGE_CACHE_SECONDS=0
+        ):
+            warm_templates()
+            for name in FEED_ROUTES:
+                client.get(urls[name])
+                timings = []
+                with _counting_compiles() as compiled:
+                    for _ in range(requests):
+                        cache.clear()
+                        elapsed, _, _, _ = _request(client, urls[name])
+                        timings.append(elapsed)
+                results[name][f'{mode}_ms'] = round(
+                    percentile(timings, 50), 3
+                )
+                results[name][f'{mode}_compiles'] = compiled[0] / requests
+    return results
+
+
+def compare(baseline, current, metrics=('p95_ms', 'queries', 'bytes')):
+    """Строки «адрес, метрика, было, стало, изменение» для отчёта."""
+    rows = []
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for metric in metrics:
+            old, new = before.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100 if old else 0
+            rows.append((name, metric, old, new, change))
+    return rows
@@ -0,0 +1,81 @@
+"""Счётчики-колонки: посты автора и сообщества, комментарии, подписки.
+
+Сигналы (см. posts.signals) сдвигают их одним UPDATE с F-выражением,
+поэтому одновременные запросы не теряют изменений, а страницам не
+нужен COUNT(*). Команда recount пересчитывает всё заново.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, Profile, User
+
+
+def _shift(queryset, field, delta):
+    if delta < 0:
+        # Разошедшийся счётчик не уходит ниже нуля.
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def _profile(user_id):
+    return Profile.objects.filter(user_id=user_id)
+
+
+def post_added(post, delta=1):
+    _shift(_profile(post.author_id), 'posts_count', delta)
+    if post.group_id is not None:
+        _shift(Group.objects.filter(pk=post.group_id), 'posts_count', delta)
+
+
+def post_removed(post):
+    post_added(post, -1)
+
+
+def post_moved(old_group_id, new_group_id):
+    if old_group_id is not None:
+        _shift(Group.objects.filter(pk=old_group_id), 'posts_count', -1)
+    if new_group_id is not None:
+        _shift(Group.objects.filter(pk=new_group_id), 'posts_count', 1)
+
+
+def comment_added(comment, delta=1):
+    _shift(Post.objects.filter(pk=comment.post_id), 'comments_count', delta)
+
+
+def comment_removed(comment):
+    comment_added(comment, -1)
+
+
+def follow_added(follow, delta=1):
+    _shift(_profile(follow.author_id), 'followers_count', delta)
+    _shift(_profile(follow.user_id), 'following_count', delta)
+
+
+def follow_removed(follow):
+    follow_added(follow, -1)
+
+
+def _count(model, field, outer='pk'):
+    rows = (
+        model.objects.filter(**{field: OuterRef(outer)}).order_by()
+        .values(field).annotate(count=Count('pk')).values('count')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def recount():
+    """Пересчитывает все счётчики, заводя недостающие профили."""
+    Profile.objects.bulk_create(
+        [
+            Profile(user_id=user_id) for user_id in
+            User.objects.filter(profile=None).values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True
+    )
+    Profile.objects.update(
+        posts_count=_count(Post, 'author', 'user_id'),
+        followers_count=_count(Follow, 'author', 'user_id'),
+        following_count=_count(Follow, 'user', 'user_id'),
+    )
+    Group.objects.update(posts_count=_count(Post, 'group'))
+    Post.objects.update(comments_count=_count(Comment, 'post'))
@@ -0,0 +1,83 @@
+"""Число записей в лентах без COUNT(*) на каждый запрос.
+
+Посты автора и сообщества считают колонки-счётчики (см. counters),
+здесь — только ленты, для которых колонки нет. Число всех постов
+лежит в кэше и поддерживается на лету сигналами создания и удаления
+постов (см. posts.signals). Отсутствующее значение считается один
+раз и живёт POSTS_COUNT_TIMEOUT секунд, так что возможное
+расхождение со временем исправляется само.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Min, Sum
+
+from .models import Post, Profile, TimelineEntry
+
+TOTAL_KEY = 'posts:count:all'
+
+
+def _cached_count(key, queryset):
+    return cache.get_or_set(
+        key, queryset.count, settings.POSTS_COUNT_TIMEOUT
+    )
+
+
+def estimate_total():
+    """Оценка числа постов по границам первичного ключа.
+
+    Два поиска по индексу вместо полного прохода; завышает результат
+    на число удалённых записей.
+    """
+    bounds = Post.objects.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['high'] is None:
+        return 0
+    return bounds['high'] - bounds['low'] + 1
+
+
+def total_count():
+    """Число постов на главной странице."""
+    count = cache.get(TOTAL_KEY)
+    if count is not None:
+        return count
+    threshold = settings.POSTS_COUNT_APPROXIMATE_THRESHOLD
+    if threshold is not None:
+        count = estimate_total()
+        if count >= threshold:
+            cache.add(TOTAL_KEY, count, settings.POSTS_COUNT_TIMEOUT)
+            return count
+    return _cached_count(TOTAL_KEY, Post.objects.all())
+
+
+def follow_count(user_id, pulled=()):
+    """Число постов в ленте подписок.
+
+    Лента обрезана до POSTS_TIMELINE_LENGTH, поэтому считаются её
+    записи — короткий проход по индексу (user, pub_date). Посты
+    авторов из pulled в ленту не раскладываются, их число берётся
+    из счётчиков профилей.
+    """
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    if not pulled:
+        return entries.count()
+    pulled_posts = Profile.objects.filter(user_id__in=pulled).aggregate(
+        count=Sum('posts_count')
+    )['count']
+    return entries.exclude(author_id__in=pulled).count() + (
+        pulled_posts or 0
+    )
+
+
+def _shift(delta):
+    try:
+        cache.incr(TOTAL_KEY, delta)
+    except ValueError:
+        # Значения нет в кэше: его посчитают при следующем чтении.
+        pass
+
+
+def post_added(post):
+    _shift(1)
+
+
+def post_removed(post):
+    _shift(-1)
@@ -0,0 +1,36 @@
+"""Контекст личных фрагментов страниц постов (см. core/holes.py)."""
+from core import holes
+
+from .forms import CommentForm
+from .models import Follow
+
+
+@holes.register('posts/includes/switcher.html')
+def switcher(request):
+    return {}
+
+
+@holes.register('posts/includes/follow_button.html')
+def follow_button(request, author, author_id):
+    # Имя автора нужно только для ссылок: подписку ищем по id, без join
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author_id=author_id
+    ).exists()
+    return {
+        'author': author,
+        'is_author': str(request.user.pk) == author_id,
+        'following': following,
+    }
+
+
+@holes.register('posts/includes/post_edit.html')
+def post_edit(request, post_id, author_id):
+    return {
+        'post_id': post_id,
+        'is_author': str(request.user.pk) == author_id,
+    }
+
+
+@holes.register('posts/includes/comment_form.html')
+def comment_form(request, post_id):
+    return {'post_id': post_id, 'form': CommentForm()}
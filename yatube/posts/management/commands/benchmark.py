@@ -0,0 +1,135 @@
+import dataclasses
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import (override_settings, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+from django.utils import timezone
+
+from posts import benchmark
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержку, число запросов и размер ответа каждого адреса '
+        'posts на синтетических данных во временной тестовой базе.'
+    )
+
+    def add_arguments(self, parser):
+        defaults = benchmark.Dataset()
+        for field in dataclasses.fields(benchmark.Dataset):
+            parser.add_argument(
+                f'--{field.name.replace("_", "-")}',
+                type=field.type,
+                default=getattr(defaults, field.name),
+            )
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--output', help='Файл для результатов в JSON.'
+        )
+        parser.add_argument(
+            '--compare', help='JSON прошлого замера для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        dataset = benchmark.Dataset(**{
+            field.name: options[field.name]
+            for field in dataclasses.fields(benchmark.Dataset)
+        })
+        media_root = tempfile.mkdtemp()
+        setup_test_environment(debug=False)
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root, POSTS_THUMBNAIL_WORKERS=0
+            ):
+                self.stdout.write('Заполняем базу...')
+                benchmark.seed(dataset)
+                self.stdout.write('Замеряем адреса...')
+                routes = benchmark.measure(
+                    options['requests'], options['warmup']
+                )
+                self.stdout.write('Замеряем разбор шаблонов...')
+                templates = benchmark.template_cost(options['requests'])
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+        report = {
+            'meta': {
+                'revision': git_revision(),
+                'created': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': settings.DATABASES['default']['ENGINE'],
+                'dataset': dataclasses.asdict(dataset),
+                'requests': options['requests'],
+            },
+            'routes': routes,
+            'templates': templates,
+        }
+        self.print_routes(routes)
+        self.print_templates(templates)
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                self.print_comparison(json.load(baseline)['routes'], routes)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+
+    def print_routes(self, routes):
+        self.stdout.write(
+            f'{"адрес":<20}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"запросы":>9}{"байты":>9}'
+        )
+        for name, result in routes.items():
+            self.stdout.write(
+                f'{name:<20}{result["p50_ms"]:>9.2f}{result["p95_ms"]:>9.2f}'
+                f'{result["p99_ms"]:>9.2f}{result["queries"]:>9}'
+                f'{result["bytes"]:>9}'
+            )
+
+    def print_templates(self, templates):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Разбор шаблонов на запрос: без кэша / с кэшем'
+        ))
+        self.stdout.write(
+            f'{"адрес":<20}{"шаблонов":>20}{"p50, мс":>20}'
+        )
+        for name, result in templates.items():
+            compiles = (
+                f'{result["uncached_compiles"]:.0f} / '
+                f'{result["cached_compiles"]:.0f}'
+            )
+            timings = (
+                f'{result["uncached_ms"]:.2f} / {result["cached_ms"]:.2f}'
+            )
+            self.stdout.write(f'{name:<20}{compiles:>20}{timings:>20}')
+
+    def print_comparison(self, baseline, routes):
+        self.stdout.write(self.style.MIGRATE_HEADING('Сравнение с прошлым'))
+        for name, metric, old, new, change in benchmark.compare(
+            baseline, routes
+        ):
+            line = f'{name:<20}{metric:<10}{old:>10}{new:>10}{change:>+9.1f}%'
+            if change > 10:
+                line = self.style.WARNING(line)
+            self.stdout.write(line)
@@ -0,0 +1,124 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from posts import search, timeline
+from posts.models import Comment, Follow, Post, User
+from posts.paginators import DEFAULT_ORDERING
+from posts.views import (COMMENTS_ORDERING, NUMBER_OF_COMMENTS,
+                         NUMBER_OF_POSTS)
+
+# Полный проход таблицы без индекса в выводе EXPLAIN QUERY PLAN SQLite;
+# поиск по индексу FTS5 выглядит как SCAN ... VIRTUAL TABLE INDEX.
+FULL_SCAN = re.compile(
+    r'\bSCAN (?:TABLE )?(\w+)\b(?! USING| VIRTUAL TABLE INDEX)'
+)
+TEMP_SORT = 'USE TEMP B-TREE'
+ANY_ID = 1
+
+
+def feed_queries():
+    """Запросы представлений в том виде, в каком они уходят в базу.
+
+    Значение — пара (queryset, разрешена ли сортировка во временном
+    B-дереве).
+    """
+    page = NUMBER_OF_POSTS + 1
+    seek = Q(pub_date__lt=timezone.now()) | Q(
+        pub_date=timezone.now(), pk__lt=ANY_ID
+    )
+    feed = Post.objects.for_feed().order_by(*DEFAULT_ORDERING)
+    reader = User(pk=ANY_ID)
+    comments = Comment.objects.select_related('author').filter(
+        post_id=ANY_ID
+    ).order_by(*COMMENTS_ORDERING)
+    comments_page = NUMBER_OF_COMMENTS + 1
+    comments_seek = Q(created__gt=timezone.now()) | Q(
+        created=timezone.now(), pk__gt=ANY_ID
+    )
+    return {
+        'index': (feed[:page], False),
+        'index (cursor)': (feed.filter(seek)[:page], False),
+        'group_posts': (feed.filter(group_id=ANY_ID)[:page], False),
+        'group_posts (cursor)': (
+            feed.filter(seek, group_id=ANY_ID)[:page], False
+        ),
+        'profile': (feed.filter(author_id=ANY_ID)[:page], False),
+        'profile (cursor)': (
+            feed.filter(seek, author_id=ANY_ID)[:page], False
+        ),
+        'profile (following)': (
+            Follow.objects.filter(user_id=ANY_ID, author_id=ANY_ID), False
+        ),
+        'follow_index (followed)': (
+            Follow.objects.filter(user_id=ANY_ID).values_list(
+                'author_id', 'author__profile__followers_count'
+            ),
+            False
+        ),
+        'follow_index': (timeline.entries(reader)[:page], False),
+        'follow_index (cursor)': (
+            timeline.entries(reader).filter(seek)[:page], False
+        ),
+        # Подмешанные авторы: две выборки по индексам сливаются сортировкой
+        'follow_index (pulled)': (
+            timeline.hybrid_posts(reader, [ANY_ID])
+            .order_by(*DEFAULT_ORDERING)[:page],
+            True
+        ),
+        # Найденные посты сортируются по дате после поиска
+        'post_search': (
+            search.search(Post.objects.for_feed(), 'слово')
+            .order_by(*DEFAULT_ORDERING)[:page],
+            True
+        ),
+        'post_detail': (
+            Post.objects.select_related('author__profile', 'group')
+            .filter(pk=ANY_ID),
+            False
+        ),
+        'post_detail (comments)': (comments[:comments_page], False),
+        'post_comments (cursor)': (
+            comments.filter(comments_seek)[:comments_page], False
+        ),
+    }
+
+
+def plan_problems(plan, sort_allowed):
+    problems = [
+        f'полный проход таблицы {table}'
+        for table in FULL_SCAN.findall(plan)
+    ]
+    if TEMP_SORT in plan and not sort_allowed:
+        problems.append('сортировка во временном B-дереве')
+    return problems
+
+
+class Command(BaseCommand):
+    help = 'Печатает планы запросов страниц постов (EXPLAIN QUERY PLAN).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Завершиться с ошибкой, если запрос идёт мимо индексов.',
+        )
+
+    def handle(self, *args, **options):
+        failures = []
+        for name, (queryset, sort_allowed) in feed_queries().items():
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(plan)
+            if connection.vendor != 'sqlite':
+                continue
+            for problem in plan_problems(plan, sort_allowed):
+                failures.append(f'{name}: {problem}')
+                self.stdout.write(self.style.WARNING(problem))
+        if options['check'] and failures:
+            raise CommandError(
+                'Запросы без подходящих индексов:\n' + '\n'.join(failures)
+            )
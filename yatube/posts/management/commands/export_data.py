@@ -0,0 +1,53 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает сообщества, посты, комментарии или подписки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=transfer.MODELS)
+        parser.add_argument('path', help='Файл выгрузки; - для stdout.')
+        parser.add_argument('--format', choices=transfer.FORMATS)
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл позиции: с ним прерванная выгрузка продолжается.',
+        )
+
+    def handle(self, *args, **options):
+        name, path = options['model'], options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        checkpoint = options['checkpoint']
+        after_pk = 0
+        if checkpoint:
+            try:
+                after_pk = transfer.read_checkpoint(checkpoint, name)
+            except transfer.TransferError as error:
+                raise CommandError(error)
+        resumed = after_pk > 0 and path != '-' and os.path.exists(path)
+        progress = self.stderr if path == '-' else self.stdout
+        stream = sys.stdout if path == '-' else open(
+            path, 'a' if resumed else 'w', newline='', encoding='utf-8'
+        )
+        total = 0
+        try:
+            for count, after_pk in transfer.export_rows(
+                transfer.MODELS[name], stream, fmt, after_pk,
+                header=not resumed, batch_size=options['batch_size']
+            ):
+                total += count
+                if checkpoint:
+                    transfer.write_checkpoint(checkpoint, name, after_pk)
+                progress.write(f'{name}: выгружено {total}')
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
@@ -0,0 +1,74 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает сообщества, посты, комментарии или подписки '
+        'и пересобирает счётчики, поиск и ленты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=transfer.MODELS)
+        parser.add_argument('path', help='Файл выгрузки; - для stdin.')
+        parser.add_argument('--format', choices=transfer.FORMATS)
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл позиции: с ним прерванная загрузка продолжается.',
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help='Не пересобирать производные данные (при загрузке '
+                 'нескольких файлов подряд — до последнего).',
+        )
+
+    def handle(self, *args, **options):
+        name, path = options['model'], options['path']
+        fmt = options['format'] or (
+            'csv' if path.endswith('.csv') else 'jsonl'
+        )
+        checkpoint = options['checkpoint']
+        stream = sys.stdin if path == '-' else open(
+            path, newline='', encoding='utf-8'
+        )
+        try:
+            position = skipped = 0
+            if checkpoint:
+                position = transfer.read_checkpoint(checkpoint, name)
+            for count, conflicts in transfer.import_rows(
+                transfer.MODELS[name], stream, fmt, position,
+                batch_size=options['batch_size']
+            ):
+                position += count
+                skipped += conflicts
+                if checkpoint:
+                    transfer.write_checkpoint(checkpoint, name, position)
+                self.stdout.write(
+                    f'{name}: прочитано {position}, пропущено {skipped}'
+                )
+        except (transfer.TransferError, ValueError) as error:
+            raise CommandError(error)
+        except IntegrityError as error:
+            raise CommandError(
+                f'пачка после записи {position} не загружена: {error}'
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        if skipped:
+            self.stdout.write(self.style.WARNING(
+                f'{name}: {skipped} записей уже были в базе и пропущены'
+            ))
+        if not options['no_rebuild']:
+            transfer.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                'Счётчики, поиск и ленты пересобраны'
+            ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import routers
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def handle(self, *args, **options):
+        # Реплика может отставать: считаем по основной базе.
+        with routers.pinned(), transaction.atomic():
+            counters.recount()
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+BACKFILL = 200
+BATCH_SIZE = 500
+
+
+def backfill_timelines(apps, schema_editor):
+    """Раскладывает последние посты авторов по лентам их подписчиков."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    follows = Follow.objects.exclude(user=None).exclude(author=None)
+    for follow in follows.iterator():
+        posts = Post.objects.filter(author_id=follow.author_id).order_by(
+            '-pub_date'
+        )[:BACKFILL]
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(
+                    user_id=follow.user_id,
+                    post_id=post.pk,
+                    author_id=post.author_id,
+                    pub_date=post.pub_date,
+                )
+                for post in posts
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_timelineentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count(model, field, outer='pk'):
+    rows = (
+        model.objects.filter(**{field: OuterRef(outer)}).order_by()
+        .values(field).annotate(count=Count('pk')).values('count')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def fill_counters(apps, schema_editor):
+    """Заводит профили пользователей и считает счётчики-колонки."""
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.bulk_create(
+        (
+            Profile(user_id=user_id)
+            for user_id in User.objects.values_list('pk', flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+    Profile.objects.update(
+        posts_count=count(Post, 'author', 'user_id'),
+        followers_count=count(Follow, 'author', 'user_id'),
+        following_count=count(Follow, 'user', 'user_id'),
+    )
+    Group.objects.update(posts_count=count(Post, 'group'))
+    Post.objects.update(comments_count=count(Comment, 'post'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0014_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
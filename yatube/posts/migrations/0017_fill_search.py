@@ -0,0 +1,57 @@
+import re
+
+from django.db import migrations
+
+FTS_TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+BATCH_SIZE = 500
+
+
+def fts5_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return 'ENABLE_FTS5' in {row[0] for row in cursor.fetchall()}
+
+
+def build_search_index(apps, schema_editor):
+    """Строит индекс поиска: FTS5 на SQLite, иначе таблицу слов."""
+    connection = schema_editor.connection
+    if fts5_available(connection):
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+            "text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            'SELECT id, text FROM posts_post'
+        )
+        return
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    max_length = SearchTerm._meta.get_field('term').max_length
+    for post in Post.objects.only('text').iterator():
+        SearchTerm.objects.bulk_create(
+            (
+                SearchTerm(post_id=post.pk, term=term[:max_length])
+                for term in set(WORD.findall(post.text.lower()))
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
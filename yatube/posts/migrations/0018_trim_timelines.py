@@ -0,0 +1,28 @@
+from django.db import migrations
+from django.db.models import OuterRef, Q, Subquery
+
+LENGTH = 1000
+
+
+def trim_timelines(apps, schema_editor):
+    """Обрезает до LENGTH записей ленты, которые выросли без обрезки."""
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    oldest_kept = TimelineEntry.objects.filter(
+        user_id=OuterRef('user_id')
+    ).order_by('-pub_date', '-pk')[LENGTH - 1:LENGTH]
+    pub_date = Subquery(oldest_kept.values('pub_date'))
+    TimelineEntry.objects.filter(
+        Q(pub_date__lt=pub_date)
+        | Q(pub_date=pub_date, pk__lt=Subquery(oldest_kept.values('pk')))
+    ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_fill_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(trim_timelines, migrations.RunPython.noop),
+    ]
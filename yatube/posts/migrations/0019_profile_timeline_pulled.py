@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:17
+
+from django.db import migrations, models
+
+FANOUT_LIMIT = 10_000
+
+
+def mark_pulled(apps, schema_editor):
+    """Флаг «звёзд», которые до сих пор помнил только кэш."""
+    Profile = apps.get_model('posts', 'Profile')
+    Profile.objects.filter(followers_count__gt=FANOUT_LIMIT).update(
+        timeline_pulled=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_trim_timelines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='timeline_pulled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_pulled, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,171 @@
+"""Кэш целых страниц.
+
+Страница хранится в общем кэше один раз для всех посетителей: личные
+фрагменты в ней заменены метками (см. core/holes.py). Два слоя:
+
+- HolesMiddleware стоит после аутентификации. Он отдаёт сохранённую
+  страницу любому посетителю, заполнив метки для него, а свежий ответ
+  представления сохраняет и тоже заполняет. Пользователю остаётся
+  отрисовать только пару мелких фрагментов.
+- PageCacheMiddleware стоит перед сессиями. Гостю без cookie сессии
+  он отдаёт уже заполненную гостевую копию: без чтения сессии,
+  контекст-процессоров и отрисовки.
+
+Запрос с cookie сообщений или привязки к основной базе идёт мимо
+кэша, как и всё, кроме GET и HEAD. Страница, отрисованная с реплики
+вскоре после изменения её лент, не сохраняется (routers.cacheable).
+
+Сохраняются только страницы под versions.conditional: декоратор
+запоминает ленты страницы и их поколение. Запись в кэше хранит их
+вместе с ответом, а при выдаче поколение сверяется с текущим —
+сигналы постов, комментариев, групп и авторов сдвигают его, и
+устаревшая страница перестаёт отдаваться.
+Всё прочее (например, год в подвале) догоняет страницу через
+PAGE_CACHE_SECONDS.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response, quote_etag
+
+from core import holes, metrics, routers
+
+from . import versions
+
+PAGES = metrics.Counter(
+    'yatube_page_cache_total', 'Обращения к кэшу страниц.',
+    ['visitor', 'result'],
+)
+# С этими cookie страница зависит от посетителя
+PERSONAL_COOKIES = ('messages', routers.PIN_COOKIE)
+
+
+def _key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'posts:page:{path}'
+
+
+def _cacheable_request(request, cookies):
+    return request.method in ('GET', 'HEAD') and not any(
+        name in request.COOKIES for name in cookies
+    )
+
+
+def _shareable(request, response):
+    return (
+        request.method == 'GET'
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+def _visitor(request):
+    return 'user' if request.user.is_authenticated else 'guest'
+
+
+def _lookup(request):
+    entry = cache.get(_key(request))
+    if (
+        entry is None
+        or versions.version(*entry['names']) != entry['version']
+    ):
+        return None
+    try:
+        # Метрики считают ответ за то представление, чья страница
+        request.resolver_match = resolve(request.path_info)
+    except Resolver404:
+        pass
+    return entry
+
+
+def _guest_response(request, guest):
+    response = HttpResponse(guest['content'], status=200)
+    for header, value in guest['headers']:
+        response[header] = value
+    return get_conditional_response(
+        request, etag=response.get('ETag'), response=response
+    )
+
+
+def _page_response(request, entry):
+    """Сохранённая страница с метками, заполненными для посетителя."""
+    if entry['guest'] is not None and not request.user.is_authenticated:
+        return _guest_response(request, entry['guest'])
+    response = HttpResponse(
+        holes.fill(request, entry['body']),
+        content_type=entry['content_type'],
+    )
+    # Те же заголовки, что дал бы versions.conditional
+    etag = quote_etag(versions.etag(request, entry['version']))
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+class PageCacheMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cookies = (settings.SESSION_COOKIE_NAME,) + PERSONAL_COOKIES
+        if not _cacheable_request(request, cookies):
+            return self.get_response(request)
+        entry = _lookup(request)
+        if entry is not None and entry['guest'] is not None:
+            PAGES.inc(visitor='guest', result='hit')
+            return _guest_response(request, entry['guest'])
+        # Страницу без гостевой копии заполнит HolesMiddleware
+        request._page_entry = entry
+        response = self.get_response(request)
+        entry = request._page_entry
+        if (
+            entry is not None
+            and entry['guest'] is None
+            and _shareable(request, response)
+            and not request.user.is_authenticated
+        ):
+            # Гостевая копия со всеми заголовками внешних слоёв
+            entry['guest'] = {
+                'content': response.content,
+                'headers': list(response.items()),
+            }
+            cache.set(_key(request), entry, settings.PAGE_CACHE_SECONDS)
+        return response
+
+
+class HolesMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cacheable = _cacheable_request(request, PERSONAL_COOKIES)
+        entry = None
+        if cacheable:
+            entry = getattr(request, '_page_entry', None) or _lookup(request)
+        if entry is not None:
+            PAGES.inc(visitor=_visitor(request), result='hit')
+            request._page_entry = entry
+            return _page_response(request, entry)
+        response = self.get_response(request)
+        if (
+            cacheable
+            and hasattr(request, '_page_names')
+            and routers.cacheable(request)
+            and _shareable(request, response)
+        ):
+            PAGES.inc(visitor=_visitor(request), result='miss')
+            request._page_entry = {
+                'names': request._page_names,
+                'version': request._page_version,
+                'body': response.content,
+                'content_type': response['Content-Type'],
+                'guest': None,
+            }
+            cache.set(
+                _key(request), request._page_entry,
+                settings.PAGE_CACHE_SECONDS
+            )
+        return holes.fill_response(request, response)
@@ -0,0 +1,261 @@
+import base64
+import binascii
+import datetime
+import json
+from collections.abc import Sequence
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import lazy
+
+NEXT = 'n'
+PREVIOUS = 'p'
+DEFAULT_ORDERING = ('-pub_date', '-pk')
+ELLIPSIS = '…'
+
+
+class InvalidCursor(Exception):
+    """Курсор повреждён или не подходит к сортировке."""
+
+
+def encode_cursor(direction, values=None):
+    """Упаковывает направление и значения ключа в непрозрачный токен."""
+    if values is not None:
+        values = [
+            value.isoformat() if isinstance(value, datetime.datetime)
+            else value
+            for value in values
+        ]
+    payload = json.dumps([direction, values], separators=(',', ':'))
+    token = base64.urlsafe_b64encode(payload.encode())
+    return token.decode().rstrip('=')
+
+
+def decode_cursor(token, model, ordering):
+    """Распаковывает токен и приводит значения к типам полей ключа."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded))
+    except (TypeError, ValueError, binascii.Error):
+        raise InvalidCursor(token)
+    if direction not in (NEXT, PREVIOUS):
+        raise InvalidCursor(token)
+    if values is None:
+        return direction, None
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor(token)
+    # В токене бывают только строки дат и целые ключи
+    if not all(
+        isinstance(value, (str, int)) and not isinstance(value, bool)
+        for value in values
+    ):
+        raise InvalidCursor(token)
+    try:
+        values = [
+            _get_field(model, name).to_python(value)
+            for name, value in zip(_field_names(ordering), values)
+        ]
+    except (
+        FieldDoesNotExist, ValidationError,
+        TypeError, ValueError, OverflowError,
+    ):
+        raise InvalidCursor(token)
+    if not all(_storable(value) for value in values):
+        raise InvalidCursor(token)
+    return direction, values
+
+
+def _storable(value):
+    """Значение ключа, которое база примет в сравнении."""
+    if isinstance(value, int):
+        return -2 ** 63 <= value < 2 ** 63
+    return value is not None
+
+
+def elided_page_range(number, num_pages, on_each_side=2, on_ends=1):
+    """Номера страниц для навигации: края и окно вокруг текущей.
+
+    Пропущенные номера заменяет ELLIPSIS, так что длина списка не
+    зависит от числа страниц.
+    """
+    if num_pages <= (on_each_side + on_ends) * 2:
+        return list(range(1, num_pages + 1))
+    pages = []
+    if number > on_each_side + on_ends + 2:
+        pages += range(1, on_ends + 1)
+        pages.append(ELLIPSIS)
+        pages += range(number - on_each_side, number + 1)
+    else:
+        pages += range(1, number + 1)
+    if number < num_pages - on_each_side - on_ends - 1:
+        pages += range(number + 1, number + on_each_side + 1)
+        pages.append(ELLIPSIS)
+        pages += range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        pages += range(number + 1, num_pages + 1)
+    return pages
+
+
+def _field_names(ordering):
+    return [name.lstrip('-') for name in ordering]
+
+
+def _get_field(model, name):
+    if name == 'pk':
+        return model._meta.pk
+    return model._meta.get_field(name)
+
+
+def _invert(ordering):
+    return [
+        name[1:] if name.startswith('-') else '-' + name
+        for name in ordering
+    ]
+
+
+class LazyList(Sequence):
+    """Список, который загружается при первом обращении."""
+
+    def __init__(self, load):
+        self._load = load
+        self._items = None
+
+    def _get(self):
+        if self._items is None:
+            self._items = list(self._load())
+        return self._items
+
+    def __len__(self):
+        return len(self._get())
+
+    def __getitem__(self, index):
+        return self._get()[index]
+
+    def __iter__(self):
+        return iter(self._get())
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор по ключу сортировки вместо OFFSET.
+
+    Страница выбирается условием «после курсора» по полям ключа,
+    поэтому её стоимость не зависит от глубины и COUNT(*) не нужен.
+    Курсор указывает на запись, а не на номер страницы, так что новые
+    записи не сдвигают уже открытые страницы. Последнее поле ключа
+    должно быть уникальным.
+
+    Лента читается при первом обращении к странице или к курсорам:
+    страница, выведенная из кэша фрагментов, запроса не стоит.
+    """
+
+    cursor_based = True
+
+    def __init__(self, object_list, per_page, ordering=DEFAULT_ORDERING):
+        super().__init__(object_list, per_page)
+        self.ordering = tuple(ordering)
+        self.last_cursor = encode_cursor(PREVIOUS)
+        self._cursor = None
+        self._rows = None
+        self._next_cursor = None
+        self._previous_cursor = None
+        self._number = 1
+        self._has_next = False
+
+    @property
+    def next_cursor(self):
+        self._load()
+        return self._next_cursor
+
+    @property
+    def previous_cursor(self):
+        self._load()
+        return self._previous_cursor
+
+    @property
+    def num_pages(self):
+        """Число страниц, известных относительно текущей."""
+        self._load()
+        return self._number + int(self._has_next)
+
+    def get_page(self, cursor=None, transform=None):
+        """Возвращает страницу по токену; с неверным — первую.
+
+        transform(rows) превращает строки ленты в объекты страницы.
+        """
+        self._cursor = cursor
+        self._rows = None
+
+        def load():
+            rows = self._load()
+            return rows if transform is None else transform(rows)
+
+        # Номер страницы тоже известен только после чтения ленты
+        number = lazy(self._page_number, int)()
+        return Page(LazyList(load), number, self)
+
+    def _page_number(self):
+        self._load()
+        return self._number
+
+    def _load(self):
+        if self._rows is None:
+            self._rows = self._fetch(self._cursor)
+        return self._rows
+
+    def _fetch(self, cursor):
+        direction, values = self._decode(cursor)
+        ordering = self.ordering
+        if direction == PREVIOUS:
+            ordering = _invert(ordering)
+        queryset = self.object_list.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(ordering, values))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            if not has_more:
+                # Дошли до начала ленты: показываем полную первую страницу.
+                return self._fetch(None)
+            rows.reverse()
+            has_previous, has_next = True, values is not None
+        else:
+            if not rows and values is not None:
+                return self._fetch(None)
+            has_previous, has_next = values is not None, has_more
+        self._next_cursor = None
+        self._previous_cursor = None
+        if has_next:
+            self._next_cursor = encode_cursor(NEXT, self._key(rows[-1]))
+        if has_previous:
+            self._previous_cursor = encode_cursor(
+                PREVIOUS, self._key(rows[0])
+            )
+        self._number = 2 if has_previous else 1
+        self._has_next = has_next
+        return rows
+
+    def _decode(self, cursor):
+        if not cursor:
+            return NEXT, None
+        try:
+            return decode_cursor(
+                cursor, self.object_list.model, self.ordering
+            )
+        except InvalidCursor:
+            return NEXT, None
+
+    def _seek(self, ordering, values):
+        """Условие «строго после values» при заданной сортировке."""
+        condition = Q()
+        equal = {}
+        for name, value in zip(ordering, values):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def _key(self, obj):
+        return [getattr(obj, name) for name in _field_names(self.ordering)]
@@ -0,0 +1,118 @@
+"""Полнотекстовый поиск по постам через обратный индекс.
+
+На SQLite индекс — виртуальная таблица FTS5 posts_post_fts с тем же
+rowid, что у поста. На прочих базах (или SQLite без FTS5) слова
+постов хранятся в таблице SearchTerm, и поиск сводится к выборкам по
+индексу этой таблицы. Индекс обновляется сигналами сохранения и
+удаления поста (см. posts.signals); запрос ищет посты, где есть слова,
+начинающиеся со всех слов запроса.
+"""
+import re
+
+from django.db import connection
+
+from .models import Post, SearchTerm
+
+FTS_TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+LAST_CHAR = '\U0010ffff'
+BATCH_SIZE = 500
+
+
+def words(text):
+    """Слова текста в нижнем регистре, без повторов."""
+    return {
+        word[:SearchTerm._meta.get_field('term').max_length]
+        for word in WORD.findall(text.lower())
+    }
+
+
+_fts_tables = {}
+
+
+def fts_enabled(conn=connection):
+    """Есть ли в базе таблица FTS5; проверяется один раз на базу."""
+    if conn.vendor != 'sqlite':
+        return False
+    name = (conn.alias, conn.settings_dict['NAME'])
+    if name not in _fts_tables:
+        _fts_tables[name] = FTS_TABLE in conn.introspection.table_names()
+    return _fts_tables[name]
+
+
+def index_post(post):
+    """Добавляет пост в индекс или обновляет его слова."""
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text]
+            )
+        return
+    SearchTerm.objects.filter(post_id=post.pk).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(post_id=post.pk, term=term) for term in words(post.text)
+    )
+
+
+def rebuild():
+    """Строит индекс заново по всем постам (после массовой загрузки)."""
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) '
+                'SELECT id, text FROM posts_post'
+            )
+        return
+    SearchTerm.objects.all().delete()
+    for post in Post.objects.only('text').iterator():
+        SearchTerm.objects.bulk_create(
+            (
+                SearchTerm(post_id=post.pk, term=term)
+                for term in words(post.text)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+
+
+def remove_post(post_id):
+    if fts_enabled():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+    # Строки SearchTerm удаляются каскадом вместе с постом.
+
+
+def search(queryset, query):
+    """Посты queryset, в которых есть слова, начинающиеся со слов запроса."""
+    terms = sorted(words(query))
+    if not terms:
+        return queryset.none()
+    if fts_enabled():
+        match = ' '.join('"{}"*'.format(term) for term in terms)
+        # filter(pk__in=RawSQL(...)) обернул бы подзапрос в скобки
+        # дважды, и SQLite вернул бы из него лишь первую строку.
+        meta = queryset.model._meta
+        return queryset.extra(
+            where=[
+                f'{meta.db_table}.{meta.pk.column} IN (SELECT rowid '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)'
+            ],
+            params=[match]
+        )
+    # Каждое слово — вложенный подзапрос: пост должен пройти все.
+    ids = None
+    for term in terms:
+        # Диапазон вместо LIKE 'term%': идёт по индексу на любой базе.
+        term_ids = SearchTerm.objects.filter(
+            term__gte=term, term__lt=term + LAST_CHAR
+        ).values('post_id')
+        ids = term_ids if ids is None else ids.filter(
+            post_id__in=term_ids
+        )
+    return queryset.filter(pk__in=ids)
@@ -0,0 +1,128 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import metrics, routers
+
+from . import counters, counts, search, timeline, versions
+from .models import Comment, Follow, Group, Post, Profile, User
+
+FOLLOWS = metrics.Counter(
+    'yatube_follows_total', 'Подписки и отписки.', ['action']
+)
+
+
+@receiver(post_save, sender=User)
+@routers.on_primary
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    if created:
+        Profile.objects.get_or_create(user=instance)
+        return
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    # Имя автора выводится в карточках его постов и в лентах с ними.
+    group_ids = Post.objects.filter(author=instance).exclude(
+        group=None
+    ).values_list('group_id', flat=True).distinct()
+    versions.bump(
+        versions.author_name(instance.pk),
+        versions.author(instance.pk),
+        versions.INDEX,
+        *(versions.group(group_id) for group_id in group_ids)
+    )
+
+
+@receiver(pre_save, sender=Post)
+@routers.on_primary
+def remember_group(sender, instance, **kwargs):
+    """Запоминает прежнюю группу редактируемого поста."""
+    if instance.pk is None:
+        instance._previous_group_id = None
+        return
+    instance._previous_group_id = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('group_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Post)
+@routers.on_primary
+def post_saved(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    versions.post_changed(instance, previous_group_id)
+    search.index_post(instance)
+    if created:
+        counts.post_added(instance)
+        counters.post_added(instance)
+        timeline.fan_out(instance)
+        return
+    if previous_group_id != instance.group_id:
+        counters.post_moved(previous_group_id, instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counts.post_removed(instance)
+    counters.post_removed(instance)
+    search.remove_post(instance.pk)
+    versions.post_changed(instance)
+
+
+@routers.on_primary
+def _comments_changed(post_id):
+    """Число комментариев выводится в лентах: сбрасываем и их."""
+    posts = Post.objects.filter(pk=post_id).only('author_id', 'group_id')
+    for post in posts:
+        versions.post_changed(post)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if instance.post_id is None:
+        return
+    if created:
+        counters.comment_added(instance)
+    _comments_changed(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id is not None:
+        counters.comment_removed(instance)
+        _comments_changed(instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    versions.bump(
+        versions.GROUPS,
+        versions.group(instance.pk),
+        versions.group_title(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Follow)
+@routers.on_primary
+def follow_saved(sender, instance, created, **kwargs):
+    if created and instance.user_id and instance.author_id:
+        # Лента решает по счётчику, читать ли автора на лету.
+        counters.follow_added(instance)
+        timeline.backfill(instance.user_id, instance.author_id)
+        FOLLOWS.inc(action='follow')
+        versions.bump(
+            versions.follow(instance.user_id),
+            versions.author(instance.author_id)
+        )
+
+
+@receiver(post_delete, sender=Follow)
+@routers.on_primary
+def follow_deleted(sender, instance, **kwargs):
+    if instance.user_id and instance.author_id:
+        counters.follow_removed(instance)
+        timeline.remove_author(instance.user_id, instance.author_id)
+        FOLLOWS.inc(action='unfollow')
+        versions.bump(
+            versions.follow(instance.user_id),
+            versions.author(instance.author_id)
+        )
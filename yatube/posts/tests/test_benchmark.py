@@ -0,0 +1,61 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from posts import benchmark
+from posts.models import Post
+from posts.urls import urlpatterns
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class BenchmarkTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_measures_every_route(self):
+        """Замер проходит по всем адресам чтения posts на своих данных"""
+        benchmark.seed(benchmark.Dataset(
+            users=5, groups=2, posts=30, comments=20, follows=2
+        ))
+        self.assertEqual(Post.objects.count(), 30)
+        results = benchmark.measure(requests=3, warmup=1)
+        self.assertEqual(
+            set(results),
+            {pattern.name for pattern in urlpatterns}
+            - set(benchmark.WRITE_ROUTES)
+        )
+        for name, result in results.items():
+            with self.subTest(name=name):
+                self.assertLess(result['status'], 400)
+                self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_template_cost(self):
+        """С прогретым кэшем ленты не разбирают шаблоны"""
+        benchmark.seed(benchmark.Dataset(
+            users=3, groups=1, posts=5, comments=5, follows=1,
+            image_ratio=0
+        ))
+        results = benchmark.template_cost(requests=2)
+        self.assertEqual(set(results), set(benchmark.FEED_ROUTES))
+        for name, result in results.items():
+            with self.subTest(name=name):
+                # Вся лента: база, страница, карточка, пагинатор и дыры,
+                # а не одни фрагменты из дыр.
+                self.assertGreaterEqual(result['uncached_compiles'], 5)
+                self.assertEqual(result['cached_compiles'], 0)
+
+    def test_percentile(self):
+        """Процентиль считается по ближайшему рангу"""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
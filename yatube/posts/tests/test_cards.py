@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+@override_settings(PAGE_CACHE_SECONDS=0)
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        cls.first = Post.objects.create(
+            text='Первый пост', author=cls.author, group=cls.group
+        )
+        cls.second = Post.objects.create(
+            text='Второй пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def page(self):
+        return self.client.get(reverse('posts:index')).content.decode()
+
+    def test_unchanged_cards_come_from_cache(self):
+        """Изменённая карточка перерисовывается, соседние — из кэша"""
+        self.page()
+        # update() не шлёт сигналов: карточка первого поста не сброшена.
+        Post.objects.filter(pk=self.first.pk).update(text='Тихая правка')
+        self.second.text = 'Новый текст'
+        self.second.save()
+        content = self.page()
+        self.assertIn('Новый текст', content)
+        self.assertIn('Первый пост', content)
+        self.assertNotIn('Тихая правка', content)
+
+    def test_author_name_renews_cards(self):
+        """Новое имя автора видно в карточках"""
+        self.page()
+        self.author.first_name = 'Лев'
+        self.author.last_name = 'Толстой'
+        self.author.save()
+        self.assertIn('Лев Толстой', self.page())
+
+    def test_last_login_keeps_cards(self):
+        """Вход автора не сбрасывает его карточки"""
+        self.client.force_login(self.author)
+        self.client.logout()
+        self.page()
+        User.objects.filter(pk=self.author.pk).update(first_name='Лев')
+        self.author.save(update_fields=['last_login'])
+        self.assertNotIn('Лев', self.page())
+
+    def test_group_change_renews_cards(self):
+        """Новый слаг группы виден в ссылках карточек"""
+        self.page()
+        self.group.slug = 'new-slug'
+        self.group.save()
+        self.assertIn(
+            reverse('posts:group_posts', args=('new-slug',)), self.page()
+        )
+
+    def test_fragment_hit_skips_feed(self):
+        """Лента из кэша фрагментов не читается из базы"""
+        self.client.force_login(self.author)
+        self.page()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIn('Второй пост', self.page())
+        self.assertFalse(
+            [query for query in queries if 'posts_post' in query['sql']]
+        )
+
+    def test_unrelated_params_share_fragment(self):
+        """Лишние параметры адреса не заводят новый фрагмент"""
+        self.page()
+        Post.objects.filter(pk=self.first.pk).update(text='Тихая правка')
+        response = self.client.get(reverse('posts:index'), {'utm': 'mail'})
+        self.assertNotContains(response, 'Тихая правка')
+
+    def test_feeds_keep_their_card_layout(self):
+        """Карточка в каждой ленте выглядит как прежде"""
+        self.author.first_name = 'Лев'
+        self.author.save()
+        profile_url = reverse('posts:profile', args=(self.author.username,))
+        group_url = reverse('posts:group_posts', args=(self.group.slug,))
+        response = self.client.get(profile_url)
+        self.assertContains(response, 'Автор: author')
+        self.assertNotContains(response, 'Автор: Лев')
+        response = self.client.get(group_url)
+        self.assertContains(response, 'Автор: Лев')
+        self.assertNotContains(response, 'все посты пользователя')
+        response = self.client.get(reverse('posts:post_search'), {'q': 'пост'})
+        self.assertContains(response, 'все посты пользователя')
+        self.assertNotContains(response, group_url)
@@ -0,0 +1,15 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class ExplainFeedsTest(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы страниц постов идут по индексам"""
+        out = StringIO()
+        call_command('explain_feeds', '--check', stdout=out)
+        self.assertIn('post_feed_idx', out.getvalue())
+        # Лента подписок проверяется по тем запросам, что шлёт follow_index
+        self.assertIn('timeline_user_pub_date_idx', out.getvalue())
+        self.assertIn('post_search', out.getvalue())
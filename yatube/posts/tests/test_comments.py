@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+from posts.views import NUMBER_OF_COMMENTS
+
+COUNT_OF_COMMENTS = NUMBER_OF_COMMENTS + 5
+
+
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = Post.objects.create(
+            text='Test_text',
+            author=User.objects.create_user(username='Ivan'),
+        )
+        for i in range(COUNT_OF_COMMENTS):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'Reader_{i}'),
+                text=f'Comment_{i}',
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_page(self):
+        """Первая страница комментариев с авторами — одним запросом"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [f'Comment_{i}' for i in range(NUMBER_OF_COMMENTS)]
+        )
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'data-comments-more')
+
+    def test_json_endpoint_continues_thread(self):
+        """Следующие комментарии подгружаются в JSON по курсору"""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        cursor = response.context['comments'].paginator.next_cursor
+        data = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'cursor': cursor}
+        ).json()
+        self.assertIsNone(data['next'])
+        self.assertIn(f'Comment_{NUMBER_OF_COMMENTS}', data['html'])
+        self.assertIn(f'Comment_{COUNT_OF_COMMENTS - 1}', data['html'])
+        self.assertNotIn('Comment_0<', data['html'])
+
+    def test_json_endpoint_unknown_post(self):
+        """Комментарии несуществующего поста — 404"""
+        response = self.client.get(
+            reverse('posts:post_comments', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,101 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import versions
+from posts.models import Comment, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=(cls.group.slug,)),
+            reverse('posts:profile', args=(cls.author.username,)),
+            reverse('posts:post_detail', args=(cls.post.pk,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_pages_not_modified(self):
+        """Неизменная страница отдаёт 304 без отрисовки и ленты"""
+        # Гостю 304 отдаёт кэш страниц, базу он не трогает.
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                with self.assertNumQueries(0):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+    def test_no_last_modified(self):
+        """Last-Modified не отдаётся: правки за одну секунду не различить"""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_changes_renew_etag(self):
+        """Новый пост и комментарий меняют ETag"""
+        changes = (
+            lambda: Post.objects.create(
+                text='Новый пост', author=self.author, group=self.group
+            ),
+            lambda: Comment.objects.create(
+                post=self.post, author=self.author, text='Комментарий'
+            ),
+        )
+        for change in changes:
+            etags = [self.client.get(url)['ETag'] for url in self.urls]
+            change()
+            for url, etag in zip(self.urls, etags):
+                with self.subTest(url=url):
+                    response = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                    self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_visitor(self):
+        """У гостя и пользователя разные ETag"""
+        url = reverse('posts:index')
+        guest = self.client.get(url)
+        authorized_client = Client()
+        authorized_client.force_login(self.author)
+        response = authorized_client.get(
+            url, HTTP_IF_NONE_MATCH=guest['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_missing_page(self):
+        """Несуществующая страница по-прежнему 404"""
+        response = self.client.get(
+            reverse('posts:group_posts', args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_version_sees_every_feed(self):
+        """Сдвиг любой ленты меняет поколение, а не только новейшей"""
+        cache.set('posts:version:{}'.format(versions.GROUPS), 10 ** 15)
+        before = versions.version(versions.GROUPS, versions.INDEX)
+        versions.bump(versions.INDEX)
+        self.assertNotEqual(
+            versions.version(versions.GROUPS, versions.INDEX), before
+        )
@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, Profile, User
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Yabloko',
+            slug='yabloko',
+            description='Opisanie',
+        )
+        cls.other_group = Group.objects.create(
+            title='Grusha',
+            slug='grusha',
+            description='Opisanie',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def assertCounters(self, profile, **expected):
+        profile.refresh_from_db()
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(profile, field), value)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками"""
+        post = Post.objects.create(
+            text='Test_text', author=self.user, group=self.group
+        )
+        self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+            data={'text': 'Comment'}
+        )
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.user}
+        ))
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertCounters(
+            self.user.profile, posts_count=1, followers_count=1
+        )
+        self.assertCounters(self.reader.profile, following_count=1)
+
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.user}
+        ))
+        post.delete()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.other_group.posts_count, 0)
+        self.assertCounters(
+            self.user.profile, posts_count=0, followers_count=0
+        )
+        self.assertCounters(self.reader.profile, following_count=0)
+
+    def test_recount_repairs_counters(self):
+        """Команда recount пересчитывает разошедшиеся счётчики"""
+        post = Post.objects.create(
+            text='Test_text', author=self.user, group=self.group
+        )
+        Comment.objects.create(post=post, author=self.reader, text='Hi')
+        Profile.objects.filter(user=self.reader).delete()
+        Profile.objects.update(posts_count=10)
+        Post.objects.update(comments_count=0)
+        call_command('recount', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertCounters(self.user.profile, posts_count=1)
+        self.assertTrue(Profile.objects.filter(user=self.reader).exists())
+
+    def test_post_detail_without_count(self):
+        """Страница поста выводит число постов автора без COUNT(*)"""
+        post = Post.objects.create(text='Test_text', author=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('posts:post_detail', kwargs={'post_id': post.pk})
+            )
+        self.assertContains(response, 'Всего постов автора:  <span >1')
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import counts
+from posts.models import Follow, Group, Post, Profile, User
+
+COUNT_OF_POSTS = 3
+
+
+class FeedCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Yabloko',
+            slug='yabloko',
+            description='Opisanie',
+        )
+        cls.other_group = Group.objects.create(
+            title='Grusha',
+            slug='grusha',
+            description='Opisanie',
+        )
+        for _ in range(COUNT_OF_POSTS):
+            Post.objects.create(
+                text='Test_text',
+                author=cls.user,
+                group=cls.group,
+            )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_counts_follow_writes(self):
+        """Счётчики лент меняются вместе с постами без пересчёта"""
+        self.assertEqual(counts.total_count(), COUNT_OF_POSTS)
+        self.assertEqual(counts.follow_count(self.reader.pk), COUNT_OF_POSTS)
+        post = Post.objects.create(
+            text='New', author=self.user, group=self.group
+        )
+        post.group = self.other_group
+        post.save()
+        Post.objects.filter(group=self.group).last().delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(counts.total_count(), COUNT_OF_POSTS)
+        self.assertEqual(counts.follow_count(self.reader.pk), COUNT_OF_POSTS)
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, COUNT_OF_POSTS - 1)
+        self.assertEqual(self.other_group.posts_count, 1)
+        self.assertEqual(
+            Profile.objects.get(user=self.user).posts_count, COUNT_OF_POSTS
+        )
+
+    @override_settings(POSTS_TIMELINE_FANOUT_LIMIT=0)
+    def test_pulled_authors_counted_from_profiles(self):
+        """Посты авторов, читаемых на лету, берутся из счётчиков"""
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                counts.follow_count(self.reader.pk, [self.user.pk]),
+                COUNT_OF_POSTS
+            )
+
+    @override_settings(POSTS_COUNT_APPROXIMATE_THRESHOLD=1)
+    def test_approximate_total(self):
+        """Большая лента считается по границам ключа"""
+        Post.objects.filter(
+            pk=Post.objects.order_by('pk')[1].pk
+        ).delete()
+        self.assertEqual(counts.total_count(), COUNT_OF_POSTS)
+
+    # Без кэша страниц: второй запрос тоже доходит до представления.
+    @override_settings(PAGE_CACHE_SECONDS=0)
+    def test_profile_shows_cached_count(self):
+        """Профиль выводит число постов без COUNT(*)"""
+        url = reverse('posts:profile', kwargs={'username': self.user})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(
+            response.context['page_obj'].paginator.count, COUNT_OF_POSTS
+        )
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
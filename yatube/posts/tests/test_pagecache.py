@@ -0,0 +1,132 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import routers
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class PageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=(cls.group.slug,)),
+            reverse('posts:profile', args=(cls.author.username,)),
+            reverse('posts:post_detail', args=(cls.post.pk,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_guest_pages_from_cache(self):
+        """Гость получает сохранённую страницу без запросов к базе"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(second.status_code, 200)
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(second['ETag'], first['ETag'])
+                self.assertNotContains(second, '<!--hole:')
+
+    def test_query_string_is_part_of_key(self):
+        """Страницы с разной строкой запроса хранятся отдельно"""
+        url = reverse('posts:index')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        response = self.client.get(url, {'page': 2})
+        self.assertIsNotNone(response.context)
+
+    def test_writes_invalidate_pages(self):
+        """Посты, комментарии и группы сбрасывают страницы"""
+        changes = (
+            lambda: Post.objects.create(
+                text='Новый пост', author=self.author, group=self.group
+            ),
+            lambda: Comment.objects.create(
+                post=self.post, author=self.author, text='Комментарий'
+            ),
+            lambda: Group.objects.filter(pk=self.group.pk).first().save(),
+        )
+        for change in changes:
+            for url in self.urls:
+                self.client.get(url)
+            change()
+            for url in self.urls:
+                with self.subTest(url=url):
+                    response = self.client.get(url)
+                    self.assertIsNotNone(response.context)
+        response = self.client.get(self.urls[0])
+        self.assertContains(response, 'Новый пост')
+
+    def test_pinned_guest_bypasses_cache(self):
+        """Гость, привязанный к основной базе, идёт мимо кэша"""
+        url = reverse('posts:index')
+        self.client.get(url)
+        pinned_client = Client()
+        pinned_client.cookies[routers.PIN_COOKIE] = '1'
+        response = pinned_client.get(url)
+        self.assertTemplateUsed(response, 'posts/index.html')
+
+    def test_users_share_cached_page(self):
+        """Пользователь получает общую страницу со своими фрагментами"""
+        url = reverse('posts:profile', args=(self.author.username,))
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(url)
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        response = reader_client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/profile.html')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'Отписаться')
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Пользователь:')
+        self.assertNotContains(response, 'Отписаться')
+
+    def test_post_page_holes(self):
+        """Форма комментария и правка — только своим"""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        edit_url = reverse('posts:post_edit', args=(self.post.pk,))
+        self.client.get(url)
+        author_client = Client()
+        author_client.force_login(self.author)
+        response = author_client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+        self.assertContains(response, edit_url)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        response = reader_client.get(url)
+        self.assertNotContains(response, edit_url)
+        self.assertContains(response, 'Добавить комментарий')
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Добавить комментарий')
+
+    def test_user_conditional_get(self):
+        """Пользователь с тем же ETag получает 304 из кэша"""
+        url = reverse('posts:index')
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        etag = reader_client.get(url)['ETag']
+        response = reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_guest_conditional_get(self):
+        """Сохранённая страница отвечает 304 на свой ETag"""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
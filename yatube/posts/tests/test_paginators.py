@@ -0,0 +1,168 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.paginators import (ELLIPSIS, NEXT, CursorPaginator,
+                              elided_page_range, encode_cursor)
+
+COUNT_OF_POSTS = 25
+POSTS_PER_PAGE = 10
+
+
+def walk_forward(queryset, per_page=POSTS_PER_PAGE):
+    """Вспомогательная функция: проходит ленту курсором до конца"""
+    pages = []
+    cursor = None
+    while True:
+        paginator = CursorPaginator(queryset, per_page)
+        page = paginator.get_page(cursor)
+        pages.append(page)
+        if not page.has_next():
+            return pages
+        cursor = paginator.next_cursor
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+        Post.objects.bulk_create(
+            Post(text=f'Test_text_{i}', author=cls.user)
+            for i in range(COUNT_OF_POSTS)
+        )
+        """У всех постов одна дата: порядок держится на втором поле"""
+        Post.objects.update(pub_date='2022-04-20T10:00:00Z')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_walk_covers_feed_once(self):
+        """Курсор проходит ленту без пропусков и повторов"""
+        pages = walk_forward(Post.objects.all())
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        pks = [post.pk for page in pages for post in page]
+        self.assertEqual(
+            pks,
+            list(Post.objects.order_by('-pub_date', '-pk')
+                 .values_list('pk', flat=True))
+        )
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[1].has_previous())
+
+    def test_new_posts_do_not_shift_pages(self):
+        """Новые записи не сдвигают следующую страницу"""
+        paginator = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        first = list(paginator.get_page())
+        expected = [post.pk for post in walk_forward(Post.objects.all())[1]]
+        Post.objects.create(text='Fresh', author=self.user)
+        second = CursorPaginator(
+            Post.objects.all(), POSTS_PER_PAGE
+        ).get_page(paginator.next_cursor)
+        self.assertEqual([post.pk for post in second], expected)
+        self.assertNotIn(first[0], second)
+
+    def test_previous_cursor_returns_to_page(self):
+        """Курсор назад возвращает предыдущую страницу"""
+        pages = walk_forward(Post.objects.all())
+        paginator = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        paginator.get_page(
+            encode_cursor(NEXT, paginator._key(pages[1][POSTS_PER_PAGE - 1]))
+        )
+        previous = CursorPaginator(
+            Post.objects.all(), POSTS_PER_PAGE
+        ).get_page(paginator.previous_cursor)
+        self.assertEqual(list(previous), list(pages[1]))
+
+    def test_last_cursor(self):
+        """Курсор последней страницы отдаёт хвост ленты"""
+        paginator = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        paginator.get_page()
+        last = CursorPaginator(
+            Post.objects.all(), POSTS_PER_PAGE
+        ).get_page(paginator.last_cursor)
+        self.assertFalse(last.has_next())
+        pks = [post.pk for page in walk_forward(Post.objects.all())
+               for post in page]
+        self.assertEqual([post.pk for post in last], pks[-POSTS_PER_PAGE:])
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Повреждённый курсор открывает первую страницу"""
+        cursors = (
+            'garbage', '!!',
+            encode_cursor(NEXT, ['x', 'y']),
+            encode_cursor(NEXT, [1.5, 2]),
+            encode_cursor(NEXT, [[], {}]),
+            encode_cursor(NEXT, [True, 1]),
+            encode_cursor(NEXT, ['2022-04-20T10:00:00', float('inf')]),
+            encode_cursor(NEXT, ['2022-04-20T10:00:00', '9' * 30]),
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                page = CursorPaginator(
+                    Post.objects.all(), POSTS_PER_PAGE
+                ).get_page(cursor)
+                self.assertFalse(page.has_previous())
+                self.assertEqual(len(page), POSTS_PER_PAGE)
+
+    def test_crafted_cursor_is_not_an_error(self):
+        """Курсор с чужими типами значений не роняет ленты и API"""
+        cursor = encode_cursor(NEXT, [1.5, 2])
+        for url in (reverse('posts:index'), reverse('api:posts')):
+            with self.subTest(url=url):
+                response = self.client.get(url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+
+    def test_feed_pages_by_cursor(self):
+        """Лента в браузере листается курсором без COUNT(*)"""
+        response = self.client.get(reverse('posts:index'))
+        next_cursor = response.context['page_obj'].paginator.next_cursor
+        self.assertContains(response, f'?cursor={next_cursor}')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse('posts:index') + f'?cursor={next_cursor}'
+            )
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+
+class ElidedPageRangeTest(TestCase):
+    def test_short_range_is_complete(self):
+        """Немного страниц выводятся все"""
+        self.assertEqual(elided_page_range(3, 6), [1, 2, 3, 4, 5, 6])
+
+    def test_window_around_current_page(self):
+        """Края, окно вокруг текущей и пропуски"""
+        self.assertEqual(
+            elided_page_range(50, 100_000),
+            [1, ELLIPSIS, 48, 49, 50, 51, 52, ELLIPSIS, 100_000]
+        )
+        self.assertEqual(
+            elided_page_range(1, 100_000),
+            [1, 2, 3, ELLIPSIS, 100_000]
+        )
+        self.assertEqual(
+            elided_page_range(100_000, 100_000),
+            [1, ELLIPSIS, 99_998, 99_999, 100_000]
+        )
+
+    def test_numbered_feed_renders_window(self):
+        """Нумерованная лента выводит окно страниц, а не все"""
+        author = User.objects.create_user(username='Pager')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=author) for i in range(200)
+        )
+        # bulk_create обходит сигналы: число постов посчитается заново.
+        cache.clear()
+        response = self.client.get(reverse('posts:index'), {'page': 10})
+        page_obj = response.context['page_obj']
+        self.assertEqual(
+            page_obj.page_range,
+            [1, ELLIPSIS, 8, 9, 10, 11, 12, ELLIPSIS, 20]
+        )
+        self.assertContains(response, 'page=20">20<')
+        self.assertNotContains(response, 'page=15"')
@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, SearchTerm, User
+
+
+def found(query):
+    """Вспомогательная функция: тексты найденных постов"""
+    return sorted(
+        search.search(Post.objects.all(), query).values_list('text', flat=True)
+    )
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+
+    def setUp(self):
+        cache.clear()
+        self.apple = Post.objects.create(
+            text='Яблоки зреют в саду', author=self.user
+        )
+        self.pear = Post.objects.create(
+            text='Груши зреют позже', author=self.user
+        )
+
+    def test_index_follows_writes(self):
+        """Индекс обновляется при создании, правке и удалении поста"""
+        self.assertTrue(search.fts_enabled())
+        self.assertEqual(found('зреют'), sorted([
+            self.apple.text, self.pear.text
+        ]))
+        self.assertEqual(found('ЯБЛОК зреют'), [self.apple.text])
+        self.pear.text = 'Сливы'
+        self.pear.save()
+        self.assertEqual(found('груши'), [])
+        self.assertEqual(found('сливы'), ['Сливы'])
+        self.apple.delete()
+        self.assertEqual(found('яблоки'), [])
+        self.assertEqual(found('"*'), [])
+
+    def test_fallback_index(self):
+        """Без FTS5 поиск идёт по таблице слов"""
+        with mock.patch.object(search, 'fts_enabled', return_value=False):
+            post = Post.objects.create(
+                text='Вишни цветут', author=self.user
+            )
+            self.assertTrue(SearchTerm.objects.filter(post=post).exists())
+            self.assertEqual(found('вишн'), [post.text])
+            self.assertEqual(found('вишни сад'), [])
+            post.delete()
+            self.assertFalse(SearchTerm.objects.exists())
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты"""
+        response = self.client.get(
+            reverse('posts:post_search'), {'q': 'груш'}
+        )
+        self.assertEqual(list(response.context['page_obj']), [self.pear])
+        self.assertEqual(response.context['query'], 'груш')
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт через индекс"""
+        request = RequestFactory().get('/')
+        queryset, use_distinct = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'яблоки'
+        )
+        self.assertEqual(list(queryset), [self.apple])
+        self.assertFalse(use_distinct)
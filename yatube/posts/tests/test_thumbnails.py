@@ -0,0 +1,106 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails, views
+from posts.models import Post, User
+from posts.thumbnails import thumbnail_key
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_thumbnail_made_after_create(self):
+        """Миниатюра режется при сохранении поста, а не при показе"""
+        self.authorized_client.post(reverse('posts:post_create'), data={
+            'text': 'Test_text',
+            'image': SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        })
+        post = Post.objects.get(text='Test_text')
+        url = cache.get(thumbnail_key(post.image.name))
+        self.assertIsNotNone(url)
+        with mock.patch('sorl.thumbnail.get_thumbnail') as get_thumbnail:
+            response = self.authorized_client.get(reverse(
+                'posts:post_detail', kwargs={'post_id': post.pk}
+            ))
+        get_thumbnail.assert_not_called()
+        self.assertContains(response, url)
+
+    @override_settings(POSTS_THUMBNAIL_WORKERS=1)
+    def test_placeholder_until_thumbnail_ready(self):
+        """Пока миниатюра не готова, выводится заглушка"""
+        post = Post.objects.create(
+            text='Test_text',
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            response = self.authorized_client.get(reverse(
+                'posts:post_detail', kwargs={'post_id': post.pk}
+            ))
+        schedule.assert_called_once_with(post.image.name)
+        self.assertContains(response, 'img/thumbnail-placeholder.svg')
+
+    def test_no_pool_never_cuts_on_render(self):
+        """Без пула показ не режет миниатюру, а выводит заглушку"""
+        post = Post.objects.create(
+            text='Test_text',
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        # Представление без обработчика: request_finished не приходит.
+        request = RequestFactory().get('/')
+        request.user = self.user
+        with mock.patch('sorl.thumbnail.get_thumbnail') as get_thumbnail:
+            response = views.post_detail(request, post_id=post.pk)
+            get_thumbnail.assert_not_called()
+            thumbnails.cut_deferred()
+        self.assertContains(response, 'img/thumbnail-placeholder.svg')
+        get_thumbnail.assert_called_once()
+
+    def test_missing_thumbnail_cut_after_response(self):
+        """Промах без пула режет миниатюру после ответа"""
+        post = Post.objects.create(
+            text='Test_text',
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        self.authorized_client.get(url)
+        # Кэш потерян: старая картинка снова без миниатюры.
+        cache.clear()
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'img/thumbnail-placeholder.svg')
+        thumbnail = cache.get(thumbnail_key(post.image.name))
+        self.assertIsNotNone(thumbnail)
+        self.assertContains(self.authorized_client.get(url), thumbnail)
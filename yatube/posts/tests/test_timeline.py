@@ -0,0 +1,134 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import counts
+from posts.models import Follow, Post, TimelineEntry, User
+
+COUNT_OF_OLD_POSTS = 3
+
+
+def follow_feed(client):
+    """Вспомогательная функция: тексты постов ленты подписок"""
+    response = client.get(reverse('posts:follow_index'))
+    return [post.text for post in response.context['page_obj']]
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.other_reader = User.objects.create_user(username='Other')
+        cls.blogger = User.objects.create_user(username='Tolik')
+        for i in range(COUNT_OF_OLD_POSTS):
+            Post.objects.create(text=f'Old_{i}', author=cls.blogger)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        """Подписка добавляет старые посты, новые раскладываются сразу"""
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.blogger}
+        ))
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(),
+            COUNT_OF_OLD_POSTS
+        )
+        Post.objects.create(text='Fresh', author=self.blogger)
+        self.assertEqual(
+            follow_feed(self.client),
+            ['Fresh', 'Old_2', 'Old_1', 'Old_0']
+        )
+
+    def test_unfollow_clears_only_own_timeline(self):
+        """Отписка чистит только ленту отписавшегося"""
+        Follow.objects.create(user=self.reader, author=self.blogger)
+        Follow.objects.create(user=self.other_reader, author=self.blogger)
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.blogger}
+        ))
+        self.assertEqual(follow_feed(self.client), [])
+        self.assertTrue(
+            Follow.objects.filter(user=self.other_reader).exists()
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.other_reader).count(),
+            COUNT_OF_OLD_POSTS
+        )
+
+    @override_settings(POSTS_TIMELINE_LENGTH=2)
+    def test_backfill_trims_timeline(self):
+        """Лента не длиннее POSTS_TIMELINE_LENGTH"""
+        Follow.objects.create(user=self.reader, author=self.blogger)
+        self.assertEqual(follow_feed(self.client), ['Old_2', 'Old_1'])
+
+    @override_settings(POSTS_TIMELINE_LENGTH=3)
+    def test_fan_out_trims_timeline(self):
+        """Новые посты не растят ленту дальше POSTS_TIMELINE_LENGTH"""
+        Follow.objects.create(user=self.reader, author=self.blogger)
+        Follow.objects.create(user=self.other_reader, author=self.blogger)
+        for i in range(6):
+            Post.objects.create(text=f'New_{i}', author=self.blogger)
+        for user in (self.reader, self.other_reader):
+            with self.subTest(user=user):
+                self.assertEqual(
+                    list(TimelineEntry.objects.filter(user=user)
+                         .order_by('-pub_date')
+                         .values_list('post__text', flat=True)),
+                    ['New_5', 'New_4', 'New_3']
+                )
+
+    @override_settings(POSTS_TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_pulled(self):
+        """Посты автора с множеством подписчиков читаются на лету"""
+        Follow.objects.create(user=self.reader, author=self.blogger)
+        Follow.objects.create(user=self.other_reader, author=self.blogger)
+        Post.objects.create(text='Fresh', author=self.blogger)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__text='Fresh').exists()
+        )
+        self.assertEqual(
+            follow_feed(self.client),
+            ['Fresh', 'Old_2', 'Old_1', 'Old_0']
+        )
+
+    @override_settings(POSTS_TIMELINE_FANOUT_LIMIT=1)
+    def test_author_back_to_fan_out_is_caught_up(self):
+        """Посты, пропущенные на лету, раскладываются после отписки"""
+        Follow.objects.create(user=self.reader, author=self.blogger)
+        Follow.objects.create(user=self.other_reader, author=self.blogger)
+        Post.objects.create(text='Fresh', author=self.blogger)
+        # Отметка «звезды» переживает потерю кэша.
+        cache.clear()
+        Follow.objects.filter(user=self.other_reader).delete()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(),
+            COUNT_OF_OLD_POSTS + 1
+        )
+        self.assertEqual(
+            follow_feed(self.client),
+            ['Fresh', 'Old_2', 'Old_1', 'Old_0']
+        )
+
+    @override_settings(POSTS_TIMELINE_LENGTH=2)
+    def test_count_follows_trimmed_timeline(self):
+        """Число постов ленты не больше, чем в неё влезает"""
+        Follow.objects.create(user=self.reader, author=self.blogger)
+        self.assertEqual(counts.follow_count(self.reader.pk), 2)
+        with override_settings(POSTS_NUMBERED_PAGINATION=True):
+            response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+
+    def test_cursor_feed_skips_count(self):
+        """Лента подписок курсором не считает свои посты"""
+        Follow.objects.create(user=self.reader, author=self.blogger)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(follow_feed(self.client)), COUNT_OF_OLD_POSTS)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts import search
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+
+COUNT_OF_POSTS = 5
+BATCH_SIZE = 2
+
+
+def run(*args):
+    """Вспомогательная функция: запуск команды без вывода"""
+    call_command(*args, stdout=StringIO(), stderr=StringIO())
+
+
+class TransferTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Ivan')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Yabloko',
+            slug='yabloko',
+            description='Opisanie',
+        )
+        for i in range(COUNT_OF_POSTS):
+            Post.objects.create(
+                text=f'Post_{i}', author=cls.user, group=cls.group
+            )
+        Comment.objects.create(
+            post=Post.objects.first(), author=cls.reader, text='Comment'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def export_all(self, fmt):
+        for name in ('group', 'post', 'comment', 'follow'):
+            run(
+                'export_data', name, self.path(f'{name}.{fmt}'),
+                '--batch-size', BATCH_SIZE
+            )
+
+    def import_all(self, fmt):
+        for name in ('group', 'post', 'comment', 'follow'):
+            run('import_data', name, self.path(f'{name}.{fmt}'))
+
+    def snapshot(self):
+        return list(Post.objects.order_by('pk').values_list(
+            'pk', 'text', 'pub_date', 'author_id', 'group_id'
+        ))
+
+    def wipe(self):
+        Group.objects.all().delete()
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка сохраняют записи, даты и ключи"""
+        for fmt in ('jsonl', 'csv'):
+            with self.subTest(fmt=fmt):
+                posts = self.snapshot()
+                self.export_all(fmt)
+                self.wipe()
+                self.import_all(fmt)
+                self.assertEqual(self.snapshot(), posts)
+                self.assertEqual(Comment.objects.count(), 1)
+                self.assertTrue(Follow.objects.filter(
+                    user=self.reader, author=self.user
+                ).exists())
+
+    def test_import_rebuilds_derived_data(self):
+        """После загрузки пересобраны счётчики, поиск и ленты"""
+        self.export_all('jsonl')
+        self.wipe()
+        self.import_all('jsonl')
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.posts_count, COUNT_OF_POSTS)
+        self.assertEqual(Group.objects.get().posts_count, COUNT_OF_POSTS)
+        self.assertEqual(
+            search.search(Post.objects.all(), 'post_3').count(), 1
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(),
+            COUNT_OF_POSTS
+        )
+
+    def test_resume_from_checkpoint(self):
+        """Прерванная загрузка продолжается с контрольной точки"""
+        run('export_data', 'post', self.path('post.jsonl'))
+        Post.objects.all().delete()
+        checkpoint = self.path('post.checkpoint')
+        with open(self.path('post.jsonl')) as source:
+            lines = source.readlines()
+        with open(self.path('head.jsonl'), 'w') as head:
+            head.writelines(lines[:BATCH_SIZE])
+        run(
+            'import_data', 'post', self.path('head.jsonl'),
+            '--checkpoint', checkpoint, '--no-rebuild'
+        )
+        with open(self.path('tail.jsonl'), 'w') as tail:
+            tail.writelines(['{"broken"\n'] * BATCH_SIZE + lines[BATCH_SIZE:])
+        run(
+            'import_data', 'post', self.path('tail.jsonl'),
+            '--checkpoint', checkpoint, '--batch-size', BATCH_SIZE
+        )
+        self.assertEqual(Post.objects.count(), COUNT_OF_POSTS)
+
+    def test_bad_record(self):
+        """Неверная запись останавливает загрузку с ошибкой"""
+        with open(self.path('bad.jsonl'), 'w') as bad:
+            bad.write('{"title": "T", "slug": "t", "colour": "red"}\n')
+        with self.assertRaisesMessage(CommandError, 'colour'):
+            run('import_data', 'group', self.path('bad.jsonl'))
+
+    def test_import_reports_skipped(self):
+        """Уже загруженные записи пропускаются и попадают в отчёт"""
+        run('export_data', 'post', self.path('post.jsonl'))
+        Post.objects.first().delete()
+        output = StringIO()
+        call_command(
+            'import_data', 'post', self.path('post.jsonl'),
+            '--no-rebuild', stdout=output
+        )
+        self.assertIn(f'пропущено {COUNT_OF_POSTS - 1}', output.getvalue())
+        self.assertEqual(Post.objects.count(), COUNT_OF_POSTS)
+
+    def test_new_rows_after_import(self):
+        """После загрузки новые записи получают свободные ключи"""
+        self.export_all('jsonl')
+        self.wipe()
+        self.import_all('jsonl')
+        post = Post.objects.create(text='New', author=self.user)
+        self.assertGreater(
+            post.pk,
+            Post.objects.exclude(pk=post.pk).order_by('-pk').first().pk
+        )
@@ -1,12 +1,14 @@
 from http import HTTPStatus
 
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 
 from posts.models import Group, Post, User
 
 ANY_POST_ID = 44
 
 
+# Страницу из кэша страниц отдают без отрисовки шаблона
+@override_settings(PAGE_CACHE_SECONDS=0)
 class PostsURLTests(TestCase):
     @classmethod
     def setUpClass(cls):
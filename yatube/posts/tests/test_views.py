@@ -8,7 +8,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from posts.models import Follow, Group, Post, User
+from posts.models import Comment, Follow, Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -34,7 +34,7 @@ def check_paginator(self, in_get, const):
     self.assertEqual(len(response.context['page_obj']), const)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, PAGE_CACHE_SECONDS=0)
 class YatubePagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -234,15 +234,24 @@ class CacheTest(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create_user(username='Ivan')
+        cls.group = Group.objects.create(
+            title='Yabloko',
+            slug='yabloko',
+        )
         cls.post = Post.objects.create(
             text='Test_text',
             author=cls.user,
+            group=cls.group,
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_cache(self):
         """Кэширование работает"""
         response_before = self.client.get(reverse('posts:index'))
-        self.post.delete()
+        # update() не шлёт сигналов, поэтому фрагмент остаётся прежним.
+        Post.objects.filter(pk=self.post.pk).update(text='Changed')
         response_after = self.client.get(reverse('posts:index'))
         self.assertEqual(response_before.content, response_after.content)
         cache.clear()
@@ -251,7 +260,61 @@ class CacheTest(TestCase):
             response_before.content, response_after_clear.content
         )
 
+    def test_post_changes_invalidate_feeds(self):
+        """Изменение поста сразу видно во всех лентах и на его странице"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            self.client.get(url)
+        self.post.text = 'Changed'
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Changed')
+
+    def test_deleted_post_disappears(self):
+        """Удалённый пост сразу пропадает с главной страницы"""
+        post = Post.objects.create(text='Doomed', author=self.user)
+        self.assertContains(self.client.get(reverse('posts:index')), 'Doomed')
+        post.delete()
+        self.assertNotContains(
+            self.client.get(reverse('posts:index')), 'Doomed'
+        )
 
+    def test_comment_invalidates_post_detail(self):
+        """Новый комментарий сразу виден на странице поста"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Fresh_comment'
+        )
+        self.assertContains(self.client.get(url), 'Fresh_comment')
+
+    def test_group_change_invalidates_group_page(self):
+        """Изменение сообщества сбрасывает его страницу"""
+        url = reverse('posts:group_posts', kwargs={'slug': self.group.slug})
+        self.client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Changed')
+        self.group.description = 'New_description'
+        self.group.save()
+        self.assertContains(self.client.get(url), 'Changed')
+
+    def test_follow_invalidates_follow_page(self):
+        """Подписка сразу меняет ленту подписок"""
+        reader = User.objects.create_user(username='Reader')
+        client = Client()
+        client.force_login(reader)
+        url = reverse('posts:follow_index')
+        self.assertNotContains(client.get(url), 'Test_text')
+        Follow.objects.create(user=reader, author=self.user)
+        self.assertContains(client.get(url), 'Test_text')
+
+
+@override_settings(PAGE_CACHE_SECONDS=0)
 class PaginatorViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -295,3 +358,49 @@ class PaginatorViewsTest(TestCase):
         check_paginator(self, reverse(
             'posts:profile', kwargs={'username': self.user}) + '?page=2',
             COUNT_OF_POSTS_ON_SECOND_PAGE_MUST_BE)
+
+
+@override_settings(PAGE_CACHE_SECONDS=0)
+class FeedQueriesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Yabloko',
+            slug='yabloko',
+        )
+        """Каждый пост со своим автором и группой: N+1 был бы заметен"""
+        for i in range(POSTS_PER_PAGE_MUST_BE):
+            author = User.objects.create_user(username=f'Author_{i}')
+            group = Group.objects.create(title=f'Group_{i}', slug=f'g-{i}')
+            Post.objects.create(text='Test_text', author=author, group=group)
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.author = author
+        for i in range(POSTS_PER_PAGE_MUST_BE):
+            Post.objects.create(
+                text='Test_text', author=cls.author, group=cls.group
+            )
+
+    def setUp(self):
+        # Бюджет считается для холодного кэша счётчиков и фрагментов
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feed_query_budget(self):
+        """Число запросов страницы ленты не зависит от числа постов"""
+        """Сессия, пользователь, счётчики ленты и сама страница"""
+        feeds = {
+            reverse('posts:index'): 5,
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}): 4,
+            reverse('posts:profile', kwargs={'username': self.author}): 5,
+            reverse('posts:follow_index'): 4,
+        }
+        for url, budget in feeds.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    response = self.authorized_client.get(url)
+                self.assertEqual(
+                    len(response.context['page_obj']), POSTS_PER_PAGE_MUST_BE
+                )
@@ -0,0 +1,146 @@
+"""Фоновая нарезка миниатюр картинок постов.
+
+Миниатюры режутся в пуле процессов сразу после сохранения поста,
+а шаблоны лишь спрашивают готовый адрес: пока миниатюры нет, вместо
+неё выводится заглушка, и страница никогда не ждёт Pillow. Адреса
+готовых миниатюр лежат в кэше; промах ставит нарезку в очередь ещё
+раз, и sorl-thumbnail отдаёт уже нарезанный файл без обработки.
+Без пула (POSTS_THUMBNAIL_WORKERS = 0) промах режет миниатюру после
+того, как ответ отдан, по сигналу request_finished.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.dispatch import receiver
+
+from core import metrics
+
+from . import versions
+
+FEED_GEOMETRY = '960x339'
+FEED_OPTIONS = {'crop': 'center', 'upscale': True}
+
+logger = logging.getLogger(__name__)
+
+GENERATED = metrics.Counter(
+    'yatube_thumbnails_total', 'Нарезанные миниатюры.', ['result']
+)
+
+_executor = None
+_pending = set()
+_deferred = set()
+_lock = threading.Lock()
+
+
+def thumbnail_key(name):
+    return f'posts:thumbnail:{FEED_GEOMETRY}:{name}'
+
+
+def thumbnail_url(image):
+    """Адрес готовой миниатюры или None, если её ещё режут.
+
+    Без пула промах не режет миниатюру в запросе: она нарежется после
+    ответа, а до тех пор выводится заглушка.
+    """
+    if not image:
+        return None
+    url = cache.get(thumbnail_key(image.name))
+    if url is None:
+        if settings.POSTS_THUMBNAIL_WORKERS:
+            schedule(image.name)
+        else:
+            with _lock:
+                _deferred.add(image.name)
+    return url
+
+
+@receiver(request_finished)
+def cut_deferred(**kwargs):
+    """Режет миниатюры, которых не хватило странице, уже после ответа."""
+    with _lock:
+        names = list(_deferred)
+        _deferred.clear()
+    for name in names:
+        schedule(name)
+
+
+def generate(name):
+    """Режет миниатюру; выполняется в процессе пула."""
+    from sorl.thumbnail import get_thumbnail
+
+    return get_thumbnail(name, FEED_GEOMETRY, **FEED_OPTIONS).url
+
+
+def _init_worker():
+    import django
+
+    django.setup()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def _store(name, url):
+    from .models import Post
+
+    if cache.get(thumbnail_key(name)) == url:
+        return
+    cache.set(thumbnail_key(name), url, settings.POSTS_THUMBNAIL_TIMEOUT)
+    # Фрагменты с заглушкой вместо миниатюры больше не нужны.
+    for post in Post.objects.filter(image=name).only('author_id', 'group_id'):
+        versions.post_changed(post)
+
+
+def _done(name, future):
+    with _lock:
+        _pending.discard(name)
+    try:
+        _store(name, future.result())
+    except Exception:
+        GENERATED.inc(result='error')
+        logger.exception('Не удалось нарезать миниатюру %s', name)
+    else:
+        GENERATED.inc(result='ok')
+
+
+def schedule(name):
+    """Ставит нарезку в очередь; повторные вызовы не дублируют работу.
+
+    При POSTS_THUMBNAIL_WORKERS = 0 миниатюра режется сразу; так
+    вызывают только после сохранения поста или после ответа.
+    """
+    if not settings.POSTS_THUMBNAIL_WORKERS:
+        try:
+            _store(name, generate(name))
+        except Exception:
+            GENERATED.inc(result='error')
+            logger.exception('Не удалось нарезать миниатюру %s', name)
+        else:
+            GENERATED.inc(result='ok')
+        return
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    try:
+        future = _get_executor().submit(generate, name)
+    except RuntimeError:
+        # Пул сломан или остановлен: попробуем при следующем показе.
+        logger.exception('Пул миниатюр недоступен')
+        with _lock:
+            _pending.discard(name)
+        return
+    future.add_done_callback(lambda future: _done(name, future))
@@ -0,0 +1,186 @@
+"""Лента подписок, собранная заранее (fan-out on write).
+
+При публикации пост раскладывается в TimelineEntry каждого
+подписчика, поэтому follow_index читает готовую ленту по индексу
+(user, -pub_date) без соединения с Follow и пересортировки. Посты
+авторов, у которых подписчиков больше POSTS_TIMELINE_FANOUT_LIMIT,
+не раскладываются: такие авторы подмешиваются при чтении. Когда
+подписчиков снова становится меньше, пропущенные посты автора
+раскладываются всем его подписчикам (catch_up); об этом помнит
+флаг Profile.timeline_pulled.
+"""
+from django.conf import settings
+from django.db.models import OuterRef, Q, Subquery
+
+from .models import Follow, Post, Profile, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def followers_counts(author_ids):
+    """Число подписчиков авторов из счётчиков профилей."""
+    counts = dict.fromkeys(author_ids, 0)
+    counts.update(
+        Profile.objects.filter(user_id__in=author_ids)
+        .values_list('user_id', 'followers_count')
+    )
+    return counts
+
+
+def is_pulled(author_id):
+    """Автор со слишком большим числом подписчиков читается на лету.
+
+    Такой автор отмечается в профиле: его посты придётся разложить,
+    когда он перестанет читаться на лету.
+    """
+    limit = settings.POSTS_TIMELINE_FANOUT_LIMIT
+    pulled = followers_counts([author_id])[author_id] > limit
+    if pulled:
+        Profile.objects.filter(
+            user_id=author_id, timeline_pulled=False
+        ).update(timeline_pulled=True)
+    return pulled
+
+
+def followed_authors(user):
+    """Авторы из подписок читателя и число их подписчиков."""
+    return dict(user.follower.values_list(
+        'author_id', 'author__profile__followers_count'
+    ))
+
+
+def pulled_authors(followed):
+    """Авторы из подписок читателя, чьи посты не раскладываются.
+
+    followed — результат followed_authors.
+    """
+    limit = settings.POSTS_TIMELINE_FANOUT_LIMIT
+    return [
+        author_id for author_id, count in followed.items()
+        if (count or 0) > limit
+    ]
+
+
+def _entry(user_id, post):
+    return TimelineEntry(
+        user_id=user_id,
+        post_id=post.pk,
+        author_id=post.author_id,
+        pub_date=post.pub_date,
+    )
+
+
+def fan_out(post):
+    """Раскладывает новый пост в ленты подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (_entry(user_id, post) for user_id in follower_ids.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim(follower_ids)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние посты нового автора из подписок."""
+    if not is_pulled(author_id):
+        _fill(user_id, author_id)
+
+
+def rebuild():
+    """Заново раскладывает ленты всех подписчиков.
+
+    Нужна после массовой загрузки, минующей сигналы; уже разложенные
+    записи не дублируются.
+    """
+    follows = Follow.objects.exclude(user=None).exclude(author=None)
+    for user_id, author_id in follows.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        if not is_pulled(author_id):
+            _fill(user_id, author_id)
+
+
+def _fill(user_id, author_id):
+    posts = Post.objects.filter(author_id=author_id).only(
+        'pk', 'author_id', 'pub_date'
+    )[:settings.POSTS_TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        (_entry(user_id, post) for post in posts),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты посты автора, от которого отписались."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+    catch_up(author_id)
+
+
+def catch_up(author_id):
+    """Раскладывает посты автора, который перестал читаться на лету.
+
+    Пока автор был отмечен is_pulled, его посты в ленты не попадали,
+    а новые подписчики не получали старых постов.
+    """
+    if is_pulled(author_id):
+        return
+    # Флаг снимает только один из параллельных вызовов.
+    if not Profile.objects.filter(
+        user_id=author_id, timeline_pulled=True
+    ).update(timeline_pulled=False):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    for user_id in follower_ids.iterator():
+        _fill(user_id, author_id)
+
+
+def trim(user_ids):
+    """Оставляет в лентах читателей не больше POSTS_TIMELINE_LENGTH записей.
+
+    Один DELETE на всех читателей: граница каждой ленты находится
+    коррелированным подзапросом по индексу (user, pub_date).
+    """
+    length = settings.POSTS_TIMELINE_LENGTH
+    oldest_kept = TimelineEntry.objects.filter(
+        user_id=OuterRef('user_id')
+    ).order_by('-pub_date', '-pk')[length - 1:length]
+    pub_date = Subquery(oldest_kept.values('pub_date'))
+    TimelineEntry.objects.filter(user_id__in=user_ids).filter(
+        Q(pub_date__lt=pub_date)
+        | Q(pub_date=pub_date, pk__lt=Subquery(oldest_kept.values('pk')))
+    ).delete()
+
+
+def entries(user):
+    """Готовая лента читателя с постами, авторами и группами."""
+    return TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    ).only(
+        'pub_date',
+        'post__text',
+        'post__pub_date',
+        'post__image',
+        'post__comments_count',
+        'post__author__username',
+        'post__author__first_name',
+        'post__author__last_name',
+        'post__group__title',
+        'post__group__slug',
+    ).order_by('-pub_date', '-pk')
+
+
+def hybrid_posts(user, pulled):
+    """Лента с подмешанными на лету постами авторов-«звёзд»."""
+    return Post.objects.for_feed().filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=pulled)
+    )
@@ -0,0 +1,214 @@
+"""Массовая выгрузка и загрузка сообществ, постов, комментариев и подписок.
+
+Записи идут потоком пачками по batch_size в форматах JSONL и CSV,
+так что память не зависит от объёма. Выгрузка листает таблицу по
+первичному ключу, загрузка пишет пачку одним bulk_create в своей
+транзакции; после каждой пачки вызывающий код сохраняет позицию,
+и прерванную работу можно продолжить с того же места. Первичные ключи
+сохраняются, а повторно загруженные записи пропускаются и
+подсчитываются. После загрузки последовательность ключей сдвигается
+за последний загруженный ключ (в PostgreSQL она сама этого не знает).
+
+bulk_create минует сигналы, поэтому после загрузки производные данные
+(счётчики, поиск, ленты подписок, кэш) собираются заново — rebuild().
+"""
+import csv
+import datetime
+import itertools
+import json
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management.color import no_style
+from django.db import connections, router, transaction
+
+from core import routers
+
+from . import counters, search, timeline
+from .models import Comment, Follow, Group, Post
+
+BATCH_SIZE = 1000
+FORMATS = ('jsonl', 'csv')
+# В порядке загрузки: посты ссылаются на сообщества и т. д.
+MODELS = {
+    'group': Group,
+    'post': Post,
+    'comment': Comment,
+    'follow': Follow,
+}
+
+
+class TransferError(Exception):
+    """Запись не подходит к модели."""
+
+
+def field_names(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def read_checkpoint(path, name):
+    """Позиция, на которой остановилась прошлая работа с моделью."""
+    try:
+        with open(path) as checkpoint:
+            state = json.load(checkpoint)
+    except FileNotFoundError:
+        return 0
+    if state.get('model') != name:
+        raise TransferError(
+            f'контрольная точка {path} относится к {state.get("model")}'
+        )
+    return state['position']
+
+
+def write_checkpoint(path, name, position):
+    with open(path, 'w') as checkpoint:
+        json.dump({'model': name, 'position': position}, checkpoint)
+
+
+def _encode(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def _writer(stream, fmt, fields, header):
+    if fmt == 'csv':
+        writer = csv.writer(stream)
+        if header:
+            writer.writerow(fields)
+        return lambda row: writer.writerow(
+            ['' if value is None else _encode(value) for value in row]
+        )
+    return lambda row: stream.write(json.dumps(
+        dict(zip(fields, map(_encode, row))), ensure_ascii=False
+    ) + '\n')
+
+
+def _reader(stream, fmt, skip):
+    """Записи после первых skip; пропущенные строки не разбираются."""
+    if fmt == 'csv':
+        return itertools.islice(csv.DictReader(stream), skip, None)
+    lines = (line for line in stream if line.strip())
+    return map(json.loads, itertools.islice(lines, skip, None))
+
+
+def export_rows(model, stream, fmt, after_pk=0, header=True,
+                batch_size=BATCH_SIZE):
+    """Пишет записи с ключом больше after_pk.
+
+    После каждой пачки отдаёт пару (число записей, последний ключ).
+    """
+    fields = field_names(model)
+    write = _writer(stream, fmt, fields, header)
+    pk_index = fields.index(model._meta.pk.attname)
+    rows = model.objects.order_by('pk').values_list(*fields)
+    while True:
+        batch = list(rows.filter(pk__gt=after_pk)[:batch_size])
+        if not batch:
+            return
+        for row in batch:
+            write(row)
+        stream.flush()
+        after_pk = batch[-1][pk_index]
+        yield len(batch), after_pk
+
+
+@contextmanager
+def _keep_dates(model):
+    """Отключает auto_now_add, чтобы сохранить даты из выгрузки.
+
+    Меняет поля модели на время загрузки, поэтому годится только для
+    отдельного процесса команды.
+    """
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _parse(fields, record, number):
+    values = {}
+    for name, value in record.items():
+        field = fields.get(name)
+        if field is None:
+            raise TransferError(f'запись {number}: неизвестное поле {name}')
+        if value in ('', None) and field.null:
+            values[name] = None
+            continue
+        try:
+            values[name] = field.to_python(value)
+        except ValidationError as error:
+            raise TransferError(
+                f'запись {number}, поле {name}: {" ".join(error.messages)}'
+            )
+    return values
+
+
+def _insert(model, objects):
+    """Пишет пачку и возвращает число пропущенных записей.
+
+    ignore_conflicts не сообщает, какие строки не вставлены, поэтому
+    записи с ключом считаются до и после вставки.
+    """
+    using = router.db_for_write(model)
+    pks = [obj.pk for obj in objects if obj.pk is not None]
+    existing = model.objects.using(using).filter(pk__in=pks)
+    with transaction.atomic(using=using):
+        before = existing.count()
+        model.objects.using(using).bulk_create(
+            objects, ignore_conflicts=True
+        )
+        inserted = existing.count() - before
+    return len(pks) - inserted
+
+
+def reset_sequences(model):
+    """Сдвигает последовательность ключей за наибольший ключ таблицы."""
+    connection = connections[router.db_for_write(model)]
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def import_rows(model, stream, fmt, skip=0, batch_size=BATCH_SIZE):
+    """Загружает записи, пропустив первые skip.
+
+    После каждой записанной пачки отдаёт пару (число прочитанных
+    записей, сколько из них уже было в базе и пропущено).
+    """
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    records = enumerate(_reader(stream, fmt, skip), start=skip + 1)
+    with _keep_dates(model):
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                break
+            objects = [
+                model(**_parse(fields, record, number))
+                for number, record in batch
+            ]
+            yield len(batch), _insert(model, objects)
+    reset_sequences(model)
+
+
+def rebuild():
+    """Пересобирает всё, что обычно поддерживают сигналы.
+
+    Читает основную базу: на реплике может не быть только что
+    загруженных строк.
+    """
+    with routers.pinned():
+        counters.recount()
+        search.rebuild()
+        cache.clear()
+        timeline.rebuild()
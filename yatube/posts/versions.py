@@ -0,0 +1,189 @@
+"""Поколения страниц для кэша фрагментов.
+
+У каждой ленты и каждого поста есть номер поколения — время последнего
+изменения в миллисекундах. Сигналы сдвигают поколения при изменении
+постов, комментариев и групп, а ключ фрагмента включает поколение,
+поэтому устаревший фрагмент просто перестаёт читаться. Пропавший из
+кэша номер заводится заново текущим временем, что тоже сбрасывает
+фрагменты.
+
+Поколение страницы — сводка поколений всех её лент, а не наибольшее
+из них: сдвиг любой ленты меняет сводку, даже если часы процессов
+расходятся.
+
+Карточки постов в лентах кэшируются отдельно, по поколениям поста,
+его группы и имени автора (post_cards). Изменение карточки сдвигает
+и ленты, где она выводится, поэтому фрагмент страницы сбрасывается
+вместе с ней, а остальные карточки при этом берутся из кэша.
+
+Те же поколения дают ETag для условного GET: пока ленты страницы не
+менялись, клиент и CDN получают 304 без отрисовки шаблона и запросов
+к ленте, а гости — целую страницу из кэша (см. pagecache).
+Last-Modified не отдаётся: его точность — секунда, а поколения
+меняются чаще, и две правки за секунду дали бы одну дату.
+"""
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from core import routers
+
+INDEX = 'index'
+GROUPS = 'groups'
+# Параметры запроса, от которых зависит фрагмент ленты
+PAGE_PARAMS = ('page', 'cursor')
+
+
+def group(group_id):
+    return f'group:{group_id}'
+
+
+def author(author_id):
+    return f'author:{author_id}'
+
+
+def follow(user_id):
+    return f'follow:{user_id}'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+def author_name(author_id):
+    return f'author-name:{author_id}'
+
+
+def group_title(group_id):
+    return f'group-title:{group_id}'
+
+
+def _key(name):
+    return f'posts:version:{name}'
+
+
+def _now():
+    return int(time.time() * 1000)
+
+
+def bump(*names):
+    """Начинает новое поколение для перечисленных лент."""
+    keys = [_key(name) for name in names]
+    current = cache.get_many(keys)
+    now = _now()
+    cache.set_many(
+        {key: max(now, current.get(key, 0) + 1) for key in keys},
+        None
+    )
+
+
+def _versions(names):
+    keys = {_key(name): name for name in names}
+    current = cache.get_many(keys)
+    missing = {key: _now() for key in keys if key not in current}
+    if missing:
+        cache.set_many(missing, None)
+        current.update(missing)
+    return {keys[key]: value for key, value in current.items()}
+
+
+def _digest(generations):
+    source = ','.join(
+        f'{name}={value}' for name, value in sorted(generations.items())
+    )
+    return hashlib.md5(source.encode()).hexdigest()
+
+
+def version(*names):
+    """Поколение страницы, собранной из перечисленных лент."""
+    return _digest(_versions(names))
+
+
+def _request_version(request, names):
+    """version() для страницы запроса.
+
+    Если ленты менялись в пределах отставания реплик, запрос
+    отмечается: его отрисовку не кладут в кэш (см. core.routers).
+    """
+    current = _versions(names)
+    routers.note_change(request, max(current.values()) / 1000)
+    return _digest(current)
+
+
+def post_cards(posts):
+    """Ставит постам card_key — ключ фрагмента карточки.
+
+    Поколения всех карточек читаются одним обращением к кэшу.
+    Возвращает список постов: подходит как transform паджинатора.
+    """
+    posts = list(posts)
+    names = {}
+    for item in posts:
+        names[item.pk] = [post(item.pk), author_name(item.author_id)]
+        if item.group_id is not None:
+            names[item.pk].append(group_title(item.group_id))
+    current = _versions({name for group in names.values() for name in group})
+    for item in posts:
+        item.card_key = '{}:{}'.format(
+            item.pk, _digest({name: current[name] for name in names[item.pk]})
+        )
+    return posts
+
+
+def fragment_key(request, *names, params=PAGE_PARAMS):
+    """Ключ фрагмента страницы: ленты, адрес, параметры и поколение.
+
+    В ключ входят только params из строки запроса: прочие параметры
+    не плодят копий фрагмента.
+    """
+    names = (GROUPS,) + names
+    query = urlencode(sorted(
+        (name, request.GET[name]) for name in params if name in request.GET
+    ))
+    return '{}:{}?{}:{}'.format(
+        ','.join(names), request.path, query,
+        _request_version(request, names)
+    )
+
+
+def etag(request, page_version):
+    """ETag страницы: адрес, посетитель, CSRF-cookie и поколение."""
+    source = '{}:{}:{}:{}'.format(
+        request.get_full_path(), request.user.pk,
+        request.META.get('CSRF_COOKIE', ''), page_version
+    )
+    return hashlib.md5(source.encode()).hexdigest()
+
+
+def conditional(names):
+    """Декоратор условного GET для страницы из лент names.
+
+    names(request, *args, **kwargs) возвращает ленты страницы. ETag
+    учитывает адрес, посетителя и CSRF-cookie: страницы разных
+    пользователей не совпадают.
+
+    Ленты и поколение остаются на запросе: по ним pagecache решает,
+    можно ли отдать страницу из кэша.
+    """
+    def page_version(request, *args, **kwargs):
+        if not hasattr(request, '_page_version'):
+            request._page_names = (GROUPS, *names(request, *args, **kwargs))
+            request._page_version = _request_version(
+                request, request._page_names
+            )
+        return request._page_version
+
+    def page_etag(request, *args, **kwargs):
+        return etag(request, page_version(request, *args, **kwargs))
+
+    return condition(etag_func=page_etag)
+
+
+def post_changed(instance, previous_group_id=None):
+    names = [INDEX, author(instance.author_id), post(instance.pk)]
+    for group_id in {instance.group_id, previous_group_id} - {None}:
+        names.append(group(group_id))
+    bump(*names)
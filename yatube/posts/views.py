@@ -1,71 +1,209 @@
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from core import routers
 
+from . import counts, search, thumbnails, timeline, versions
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Follow, Group, Post, User
+from .paginators import CursorPaginator, LazyList, elided_page_range
 
 NUMBER_OF_POSTS = 10
+NUMBER_OF_COMMENTS = 20
+COMMENTS_ORDERING = ('created', 'pk')
+
 
+def paginator_func(post_list, request, count=None, transform=None):
+    """Паджинатор.
 
-def paginator_func(post_list, request):
-    """Паджинатор."""
-    paginator = Paginator(post_list, NUMBER_OF_POSTS)
+    По умолчанию листает ленту курсором (?cursor=), нумерованные
+    страницы включаются параметром ?page= или настройкой
+    POSTS_NUMBERED_PAGINATION. Готовое число записей из count
+    избавляет от COUNT(*) по ленте; если count — функция, она
+    вызывается только для нумерованных страниц: курсору число не нужно.
+    У нумерованной страницы есть page_range: номера вокруг текущей и по
+    краям вместо всех страниц.
+
+    Записи страницы читаются при первом обращении; transform(rows)
+    превращает их в объекты страницы.
+    """
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    if page_number is not None or settings.POSTS_NUMBERED_PAGINATION:
+        paginator = Paginator(post_list, NUMBER_OF_POSTS)
+    else:
+        paginator = CursorPaginator(post_list, NUMBER_OF_POSTS)
+    if isinstance(paginator, CursorPaginator):
+        if count is not None and not callable(count):
+            paginator.count = count
+        return paginator.get_page(request.GET.get('cursor'), transform)
+    if count is not None:
+        paginator.count = count() if callable(count) else count
+    page = paginator.get_page(page_number)
+    if transform is not None:
+        rows = page.object_list
+        page.object_list = LazyList(lambda: transform(rows))
+    page.page_range = elided_page_range(page.number, paginator.num_pages)
+    return page
+
+
+def comments_page(post_id, request):
+    """Страница комментариев поста: курсором по времени, от старых."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only(
+        'text', 'created', 'post_id', 'author__username'
+    ).order_by(*COMMENTS_ORDERING)
+    paginator = CursorPaginator(
+        comments, NUMBER_OF_COMMENTS, ordering=COMMENTS_ORDERING
+    )
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def _page_object(request, queryset, **lookup):
+    """Объект страницы, один на запрос: нужен и ETag, и представлению."""
+    if not hasattr(request, '_page_object'):
+        request._page_object = get_object_or_404(queryset, **lookup)
+    return request._page_object
+
+
+def _group(request, slug):
+    return _page_object(request, Group, slug=slug)
+
+
+def _author(request, username):
+    return _page_object(
+        request, User.objects.select_related('profile'), username=username
+    )
+
+
+def _post(request, post_id):
+    return _page_object(
+        request,
+        Post.objects.select_related('author__profile', 'group'),
+        pk=post_id
+    )
+
+
+def _group_names(request, slug):
+    return [versions.group(_group(request, slug).pk)]
+
+
+def _profile_names(request, username):
+    return [versions.author(_author(request, username).pk)]
+
+
+def _post_names(request, post_id):
+    post = _post(request, post_id)
+    return [versions.post(post.pk), versions.author(post.author_id)]
 
 
+@versions.conditional(lambda request: [versions.INDEX])
 def index(request):
     """Функция для отображения главной страницы проекта."""
-    post_list = Post.objects.all()
-    page_obj = paginator_func(post_list, request)
-    return render(request, 'posts/index.html', {'page_obj': page_obj})
+    post_list = Post.objects.for_feed()
+    page_obj = paginator_func(
+        post_list, request, counts.total_count(), versions.post_cards
+    )
+    context = {
+        'page_obj': page_obj,
+        'fragment_key': versions.fragment_key(request, versions.INDEX),
+    }
+    return render(request, 'posts/index.html', context)
 
 
+@versions.conditional(_group_names)
 def group_posts(request, slug):
     """Функция для отображения страницы сообщества."""
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = paginator_func(post_list, request)
+    group = _group(request, slug)
+    post_list = group.posts.for_feed()
+    page_obj = paginator_func(
+        post_list, request, group.posts_count,
+        versions.post_cards
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        'fragment_key': versions.fragment_key(
+            request, versions.group(group.pk)
+        ),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@versions.conditional(_profile_names)
 def profile(request, username):
     """Функция для отображения профиля пользователя."""
-    user = get_object_or_404(User, username=username)
-    post_list = user.posts.all()
-    page_obj = paginator_func(post_list, request)
-    following = False
-    following = request.user.is_authenticated and Follow.objects.filter(
-        user=request.user,
-        author=user
-    ).exists()
+    user = _author(request, username)
+    post_list = user.posts.for_feed()
+    page_obj = paginator_func(
+        post_list, request, user.profile.posts_count,
+        versions.post_cards
+    )
     context = {
         'user_obj': user,
         'page_obj': page_obj,
-        'following': following
+        'fragment_key': versions.fragment_key(
+            request, versions.author(user.pk)
+        ),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def post_search(request):
+    """Функция для поиска по текстам постов."""
+    query = request.GET.get('q', '').strip()
+    post_list = search.search(Post.objects.for_feed(), query)
+    page_obj = paginator_func(
+        post_list, request, transform=versions.post_cards
+    )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'fragment_key': versions.fragment_key(
+            request, versions.INDEX, params=('q',) + versions.PAGE_PARAMS
+        ),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@versions.conditional(_post_names)
 def post_detail(request, post_id):
     """Функция для вывода конкретной записи."""
-    post = get_object_or_404(Post, pk=post_id)
-    form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    post = _post(request, post_id)
+    comments = comments_page(post.pk, request)
     context = {
-        'form': form,
         'comments': comments,
-        'post': post
+        'post': post,
+        'fragment_key': versions.fragment_key(
+            request, versions.post(post.pk), versions.author(post.author_id)
+        ),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    """Следующая страница комментариев для подгрузки без перезагрузки."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comments_page(post_id, request)
+    next_url = None
+    if comments.has_next():
+        next_url = '{}?cursor={}'.format(
+            reverse('posts:post_comments', args=(post_id,)),
+            comments.paginator.next_cursor
+        )
+    html = render_to_string(
+        'posts/includes/comment_list.html', {'comments': comments}, request
+    )
+    return JsonResponse({'html': html, 'next': next_url})
+
+
 @login_required
 def post_create(request):
     """Функция для создания записи."""
@@ -83,6 +221,8 @@ def post_create(request):
         )
 
         post.save()
+        if post.image:
+            thumbnails.schedule(post.image.name)
 
         return redirect('posts:profile', user.username)
     return render(request, 'posts/create_post.html', {'form': form})
@@ -110,6 +250,8 @@ def post_edit(request, post_id):
     post.group = form.cleaned_data['group']
     post.author = user
     post.save()
+    if post.image:
+        thumbnails.schedule(post.image.name)
     return redirect('posts:post_detail', post_id)
 
 
@@ -127,35 +269,47 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator_func(post_list, request)
+    followed = timeline.followed_authors(request.user)
+    pulled = timeline.pulled_authors(followed)
+    # Число постов нужно только нумерованным страницам
+    count = partial(counts.follow_count, request.user.pk, pulled)
+    if pulled:
+        post_list = timeline.hybrid_posts(request.user, pulled)
+        page_obj = paginator_func(
+            post_list, request, count, versions.post_cards
+        )
+    else:
+        page_obj = paginator_func(
+            timeline.entries(request.user), request, count,
+            lambda entries: versions.post_cards(
+                entry.post for entry in entries
+            )
+        )
     context = {
         'page_obj': page_obj,
+        'fragment_key': versions.fragment_key(
+            request,
+            versions.follow(request.user.pk),
+            *(versions.author(author_id) for author_id in followed)
+        ),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@routers.pin_writes
 def profile_follow(request, username):
     if request.user.username != username:
         user_obj = get_object_or_404(User, username=username)
-        if not Follow.objects.filter(
-            user=request.user,
-            author=user_obj
-        ).exists():
-            user_obj = get_object_or_404(User, username=username)
-            follow = Follow.objects.create(
-                user=request.user,
-                author=user_obj
-            )
-            follow.save()
+        Follow.objects.get_or_create(user=request.user, author=user_obj)
     return redirect('posts:follow_index')
 
 
 @login_required
+@routers.pin_writes
 def profile_unfollow(request, username):
     if request.user.username != username:
         user_obj = get_object_or_404(User, username=username)
-        unfollow = Follow.objects.filter(author=user_obj)
+        unfollow = Follow.objects.filter(user=request.user, author=user_obj)
         unfollow.delete()
     return redirect('posts:follow_index')
@@ -0,0 +1,21 @@
+// Подгрузка следующих страниц комментариев без перезагрузки страницы.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('[data-comments-more]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.dataset.commentsMore, {credentials: 'same-origin'})
+    .then(function (response) { return response.json(); })
+    .then(function (data) {
+      document.getElementById('comment-list')
+        .insertAdjacentHTML('beforeend', data.html);
+      if (data.next) {
+        link.dataset.commentsMore = data.next;
+        link.href = data.next.slice(data.next.indexOf('?'));
+      } else {
+        link.remove();
+      }
+    })
+    .catch(function () { window.location = link.href; });
+});
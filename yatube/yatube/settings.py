@@ -46,10 +46,15 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.profiling.ProfilingMiddleware',
+    'core.routers.ReplicaMiddleware',
+    'posts.pagecache.PageCacheMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,24 +62,40 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'posts.pagecache.HolesMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Скомпилированные шаблоны хранятся в памяти процесса и собираются
+# заранее при старте (см. core/warmup.py). При отладке шаблоны
+# перечитываются на каждый запрос, чтобы правки были видны сразу.
+TEMPLATE_CACHE = os.getenv(
+    'YATUBE_TEMPLATE_CACHE', '0' if DEBUG else '1'
+) == '1'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATE_CACHE else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
-                'core.context_processors.year.year'
+                'core.context_processors.year.year',
+                'core.context_processors.fragments.fragment_timeout',
             ],
         },
     },
@@ -86,13 +107,64 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# База выбирается переменной окружения YATUBE_DB: sqlite (по умолчанию)
+# или postgres (нужен пакет psycopg2, параметры — в POSTGRES_* и DB_*).
+DATABASE_ENGINE = os.getenv('YATUBE_DB', 'sqlite')
+# Сколько секунд соединение живёт между запросами; 0 — на каждый запрос
+# новое. Каждый поток держит своё соединение, так что пул — это воркеры.
+CONN_MAX_AGE = int(os.getenv('YATUBE_DB_CONN_MAX_AGE', 60))
+
+if DATABASE_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'yatube'),
+            'USER': os.getenv('POSTGRES_USER', 'yatube'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', '127.0.0.1'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+            # PgBouncer в режиме транзакций не держит серверные курсоры
+            'DISABLE_SERVER_SIDE_CURSORS': (
+                os.getenv('DB_POOLER') == 'pgbouncer'
+            ),
+        }
     }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+            'CONN_MAX_AGE': CONN_MAX_AGE,
+        }
+    }
+
+# Прагмы каждого нового соединения SQLite, см. core/db.py
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'busy_timeout': 5000,
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
 }
 
+# Реплики для чтения: YATUBE_DB_REPLICAS — через запятую пути к файлам
+# SQLite или адреса серверов PostgreSQL. Для проверки на одной машине
+# подойдёт копия db.sqlite3. В тестах реплики смотрят в основную базу.
+DATABASE_REPLICAS = []
+for number, location in enumerate(
+    filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME' if DATABASE_ENGINE == 'sqlite' else 'HOST': location,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает с основной базы
+DATABASE_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -151,10 +223,105 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Общее для всех процессов хранилище кэша выбирается переменной
+# окружения YATUBE_CACHE: locmem (по умолчанию, только один процесс),
+# file, memcached или redis. Клиенты memcached и redis (python-memcached,
+# django-redis) ставятся из requirements-cache.txt.
+# YATUBE_CACHE_LOCATION переопределяет адрес или каталог хранилища.
+# locmem и file по умолчанию держат лишь 300 записей, а в кэше лежат
+# поколения постов, авторов и групп, карточки и целые страницы: при
+# таком пределе они вытесняли бы друг друга. CACHE_MAX_ENTRIES задаёт
+# предел явно; memcached и redis ограничены своей памятью.
+CACHE_MAX_ENTRIES = int(os.getenv('YATUBE_CACHE_MAX_ENTRIES', 100_000))
+SHARED_CACHES = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, '.cache'),
+        'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES},
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211',
+    },
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    },
 }
+CACHE_STORE = os.getenv('YATUBE_CACHE', 'locmem')
+SHARED_CACHE = dict(SHARED_CACHES[CACHE_STORE])
+if os.getenv('YATUBE_CACHE_LOCATION'):
+    SHARED_CACHE['LOCATION'] = os.getenv('YATUBE_CACHE_LOCATION')
+
+if CACHE_STORE == 'locmem':
+    CACHES = {'default': SHARED_CACHE}
+else:
+    # Память процесса перед общим хранилищем, см. core/cache.py
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TieredCache',
+            'OPTIONS': {
+                'SHARED': 'shared',
+                'LOCAL_TIMEOUT': 5,
+                'LOCAL_MAX_ENTRIES': 10_000,
+                'SHARED_ONLY': ['posts:version:', 'posts:count:'],
+            },
+        },
+        'shared': SHARED_CACHE,
+    }
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Доля профилируемых запросов (0 — только с заголовком X-Profile)
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+# Сколько последних профилей хранит каждый процесс
+PROFILING_BUFFER_SIZE = 50
+
+# Каталог для метрик воркеров; без него /metrics отдаёт метрики
+# только своего процесса.
+METRICS_DIR = os.getenv('METRICS_DIR')
+# Не чаще раза в столько секунд процесс пишет метрики в METRICS_DIR
+METRICS_FLUSH_SECONDS = 10
+# Адреса, которым /metrics отдаётся без входа (персоналу — всегда).
+# За обратным прокси здесь нужен адрес самого прокси-сервера.
+METRICS_ALLOWED_IPS = os.getenv(
+    'METRICS_ALLOWED_IPS', '127.0.0.1,::1'
+).split(',')
+
+# Сколько секунд действует токен API
+API_TOKEN_MAX_AGE = 60 * 60 * 24 * 30
+
+# Сколько секунд живёт страница в кэше страниц; сигналы
+# сбрасывают её раньше, см. posts/pagecache.py
+PAGE_CACHE_SECONDS = 60 * 10
+# Сколько секунд живёт фрагмент шаблона; устаревший по поколению
+# фрагмент больше не читается и лишь дожидается этого срока
+FRAGMENT_CACHE_SECONDS = 60 * 60 * 24
+
+# Ленты листаются курсором; True возвращает нумерованные страницы
+POSTS_NUMBERED_PAGINATION = False
+
+# Сколько секунд живёт посчитанное число постов ленты
+POSTS_COUNT_TIMEOUT = 60 * 60
+# С этого числа постов главная лента считается приблизительно
+POSTS_COUNT_APPROXIMATE_THRESHOLD = 1_000_000
+
+# Посты авторов с большим числом подписчиков не раскладываются по лентам
+POSTS_TIMELINE_FANOUT_LIMIT = 10_000
+# Сколько последних постов автора попадает в ленту при подписке
+POSTS_TIMELINE_BACKFILL = 200
+# Предельная длина ленты подписок одного читателя
+POSTS_TIMELINE_LENGTH = 1000
+
+# Процессы фоновой нарезки миниатюр; 0 — резать только при сохранении
+# поста, а при показе выводить заглушку. Процессы пула не видят
+# тестовую базу, поэтому при отладке пула нет.
+POSTS_THUMBNAIL_WORKERS = int(
+    os.getenv('POSTS_THUMBNAIL_WORKERS', 0 if DEBUG else 2)
+)
+# Сколько секунд кэш помнит адрес готовой миниатюры
+POSTS_THUMBNAIL_TIMEOUT = 60 * 60 * 24
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Шаблоны компилируются до первого запроса, см. core/warmup.py
+from core.warmup import warm_templates  # noqa: E402
+
+warm_templates()